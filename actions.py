@@ -1,18 +1,18 @@
 from __future__ import annotations
 
 import math
-from dice import dice_roller
 from typing import Optional, Tuple, TYPE_CHECKING
 
-from equipment_types import EquipmentTraits
 from animations import BaseAnimation, AttackAnimation
+from entity import Item
 
 import color
+from combat import resolve_round
 import exceptions
 
 if TYPE_CHECKING:
     from engine import Engine
-    from entity import Actor, Entity, Item
+    from entity import Actor, Entity
 
 
 class Action:
@@ -48,25 +48,15 @@ class PickupAction(Action):
         actor_location_y = self.entity.y
         inventory = self.entity.inventory
 
-        for item in self.engine.game_map.items:
-            if actor_location_x == item.x and actor_location_y == item.y:
+        for item in self.engine.game_map.get_entities_at_location(actor_location_x, actor_location_y):
+            if isinstance(item, Item):
                 
-                # check to see if the item is already stacked in the inventory/is stackable before grabbing
-                if len(inventory.items_stacked) >= inventory.capacity and not item.stackable:
+                # a full inventory still takes items that go on an existing stack
+                if not inventory.has_room_for(item):
                     raise exceptions.Impossible("Your inventory is full.")
-                elif len(inventory.items_stacked) >= inventory.capacity and item.stackable:
-                    item_stacked = False
-                    for item_list in inventory.items_stacked:
-                        if item.name == item_list[0].name:
-                            item_stacked = True
-                            break
-                    if not item_stacked:
-                        raise exceptions.Impossible("Your inventory is full.")
 
-
-                self.engine.game_map.entities.remove(item)
-                item.parent = self.entity.inventory
-                inventory.items.append(item)
+                self.engine.game_map.remove_entity(item)
+                inventory.add(item)
 
                 self.engine.message_log.add_message(f"You pick up the {item.name}.")
                 return
@@ -125,12 +115,21 @@ class TakeStairsAction(Action):
         """
         Take the stairs, if any exist at the entity's location.
         """
-        if (self.entity.x, self.entity.y) == self.engine.game_map.downstairs_location:
-            self.engine.game_world.generate_floor()
+        location = (self.entity.x, self.entity.y)
+        game_world = self.engine.game_world
+
+        if location == self.engine.game_map.downstairs_location:
+            game_world.change_floor(game_world.current_floor + 1)
             self.engine.viewport.game_map = self.engine.game_map
             self.engine.message_log.add_message(
                 "You descend the staircase.", color.descend
             )
+        elif location == self.engine.game_map.upstairs_location and game_world.current_floor > 1:
+            game_world.change_floor(game_world.current_floor - 1)
+            self.engine.viewport.game_map = self.engine.game_map
+            self.engine.message_log.add_message(
+                "You ascend the staircase.", color.descend
+            )
         else:
             raise exceptions.Impossible("There are no stairs here.")
 
@@ -173,105 +172,24 @@ class MeleeAction(ActionWithDirection):
         else:
             attack_color = color.enemy_atk
 
-        last_attack_hit = False
-
         hit_animations = []
 
-        for i in range(self.entity.fighter.attacks_per_round):
-            
-            # attack info format: [to hit, number of dice, die size, damage bonuses, equipment trait list, critical dice (tuple form)]
-            attack_info = self.entity.fighter.damage
-
-            to_hit = attack_info[0]
-            num_dice = attack_info[1]
-            die_size = attack_info[2]
-            dam_bonus = attack_info[3]
-            equipment_traits = attack_info[4]
-            crit_bonus = attack_info[5]
-
-            if crit_bonus is not None:
-                crit_num = crit_bonus[0]
-                crit_size = crit_bonus[1]
-
-            deadly = False
-            fatal = False
-
-            # TODO: pull data from entity instead of hardcode at 0
-            extra_attack_penalty_mod = 0
-
-            # modify attack based on the various item traits
-            if equipment_traits is not None:
-                for x in equipment_traits:
-                    if x == EquipmentTraits.AGILE:
-                        extra_attack_penalty_mod += 1
-                    elif x == EquipmentTraits.BACKSWING:
-                        if last_attack_hit == False:
-                            extra_attack_penalty_mod += 1
-                    elif x == EquipmentTraits.DEADLY:
-                        deadly = True
-                    elif x == EquipmentTraits.FATAL:
-                        fatal = True
-                    elif x == EquipmentTraits.FINESSE:
-                        # don't do finesse if the attack is from a monster, since finesse already factors into their to-hit
-                        if self.entity is self.engine.player:
-                            to_hit -= self.entity.fighter.str_mod
-                            to_hit += max(self.entity.fighter.dex_mod, self.entity.fighter.str_mod)
-                    elif x == EquipmentTraits.FORCEFUL:
-                        for z in range(i):
-                            dam_bonus += num_dice
-                    elif x == EquipmentTraits.SWEEP:
-                        extra_attack_penalty_mod += 1
-
-            # roll attack roll and add to-hit mod, for every attack besides the first in a round subtract 5 (can be modified by weapon)
-            nat_roll = dice_roller(1, 20)
-            to_hit = to_hit - i * (5 - extra_attack_penalty_mod)
-            attack_roll = nat_roll + to_hit
+        swings = resolve_round(self.entity.fighter.attack_profile, target.fighter.ac, self.engine.rng.combat)
+        attacker_name = self.entity.name.capitalize()
 
-            self.engine.message_log.add_message(
-                f"{self.entity.name.capitalize()} rolls a {nat_roll} + {to_hit} to hit {target.name}.",
-                attack_color
-            )
+        message_log = self.engine.message_log
 
-            # if attack roll exceeds ac by more than 10 or is a nat 20 crit and deal double damage
-            if attack_roll >= target.fighter.ac:
-                if attack_roll - target.fighter.ac >= 10 or nat_roll == 20:
-                    
-                    # calculate fatal damage/normal crit damage
-                    if fatal == True:
-                        damage = dice_roller(num_dice + 1, crit_size) + dam_bonus * 2
-                    else:
-                        damage = dice_roller(num_dice, die_size) + dam_bonus * 2
-                    
-                    # if deadly then add the deadly dice
-                    if deadly == True:
-                        damage += dice_roller(crit_num, crit_size)
-                    
-                    # inform player of critical
-                    self.engine.message_log.add_message(
-                        "That was a critical hit!",
-                        attack_color
-                    )
-                else:
-                    damage = dice_roller(num_dice, die_size) + dam_bonus
-            
-            # if attack roll was a miss but was a nat 20 make it a hit
-            elif nat_roll == 20 and attack_roll - target.fighter.ac < 10:
-                damage = dice_roller(num_dice, die_size) + dam_bonus
-            
-            # miss
-            else:
-                damage = 0
+        for nat_roll, to_hit, damage, critical in swings:
+            message_log.add_event("to_hit", attack_color, attacker_name, nat_roll, to_hit, target.name)
 
-            # TODO: pull attack desc from attack itself
-            attack_desc = f"{self.entity.name.capitalize()} kicks {target.name}"
+            # inform player of critical
+            if critical:
+                message_log.add_event("critical", attack_color)
 
             if damage > 0:
-                self.engine.message_log.add_message(
-                    f"{attack_desc} for {damage} damage.", attack_color
-                )
+                message_log.add_event("hit", attack_color, attacker_name, target.name, damage)
                 target.fighter.hp -= damage
-                
-                last_attack_hit = True
+
                 hit_animations.append(AttackAnimation(target, self.entity))
 
                 # don't keep attacking if they die!
@@ -279,11 +197,8 @@ class MeleeAction(ActionWithDirection):
                     break
 
             else:
-                self.engine.message_log.add_message(
-                    f"{self.entity.name.capitalize()} misses {target.name}.", attack_color
-                )
-                last_attack_hit = False
-        
+                message_log.add_event("miss", attack_color, attacker_name, target.name)
+
         return hit_animations
 
 
@@ -1,24 +1,127 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, List, Tuple, Optional
+import time
+from typing import TYPE_CHECKING, Iterable, List, Sequence, Tuple, Optional
+
+import numpy as np  # type: ignore
 
 import color
-import numpy as np
-import tcod.path
 
 from entity import Actor
 
 if TYPE_CHECKING:
-    from tcod import Console
-    from engine import Engine
+    from tcod.console import Console
+
+# Animations were drawn one step per frame at 60 FPS, they now play at that speed whatever the frame rate.
+FRAME_SECONDS = 1 / 60
+
+# One glyph an animation draws on a map tile, and the time span (in seconds since the animation started) it is shown.
+glyph_dt = np.dtype(
+    [
+        ("x", np.int32),
+        ("y", np.int32),
+        ("ch", np.int32),
+        ("fg", np.uint8, 4),
+        ("start", np.float64),
+        ("end", np.float64),
+    ]
+)
+
+# Glyphs drawn around a tile, as (dx, dy, codepoint).
+BURST_GLYPHS = [
+    (-1, -1, 0xE105), (0, -1, 0xE101), (1, -1, 0xE106),
+    (-1, 0, 0xE104), (1, 0, 0xE103),
+    (-1, 1, 0xE107), (0, 1, 0xE102), (1, 1, 0xE108),
+]
+
+# The side of the burst facing away from the attacker, keyed by the direction of the attacker from the target.
+ATTACK_GLYPHS = {
+    (1, 0): [(-1, 0, 0xE104), (-1, 1, 0xE107), (-1, -1, 0xE105)],
+    (-1, 0): [(1, 0, 0xE103), (1, -1, 0xE106), (1, 1, 0xE108)],
+    (0, 1): [(-1, -1, 0xE105), (0, -1, 0xE101), (1, -1, 0xE106)],
+    (0, -1): [(-1, 1, 0xE107), (0, 1, 0xE102), (1, 1, 0xE108)],
+    (1, 1): [(-1, -1, 0xE105), (0, -1, 0xE101), (-1, 0, 0xE104)],
+    (1, -1): [(-1, 0, 0xE104), (-1, 1, 0xE107), (0, 1, 0xE102)],
+    (-1, 1): [(0, -1, 0xE101), (1, -1, 0xE106), (1, 0, 0xE103)],
+    (-1, -1): [(1, 0, 0xE103), (0, 1, 0xE102), (1, 1, 0xE108)],
+}
+
+
+def glyph_table(
+    x: int, y: int, glyphs: Sequence[Tuple[int, int, int]], fg: Tuple[int, int, int], start: float, end: float
+) -> np.ndarray:
+    """Return 'glyphs' placed around (x, y) as rows of glyph_dt, all shown from 'start' to 'end'."""
+    table = np.zeros(len(glyphs), dtype=glyph_dt)
+    if glyphs:
+        dx, dy, ch = np.array(glyphs).T
+        table["x"] = x + dx
+        table["y"] = y + dy
+        table["ch"] = ch
+    table["fg"] = (*fg, 255)
+    table["start"] = start
+    table["end"] = end
+    return table
+
 
 class BaseAnimation:
     def __init__(self, frames: int = 0) -> None:
         self.frames = frames
-    
-    def anim_render(self, console: Console, engine: Engine) -> bool:
-        """Render the animation. Return True if the current animation is complete."""
-        return True
+
+    @property
+    def duration(self) -> float:
+        return self.frames * FRAME_SECONDS
+
+    def glyphs(self) -> np.ndarray:
+        """Return every glyph of the animation as rows of glyph_dt, with times relative to its start."""
+        return np.zeros(0, dtype=glyph_dt)
+
+
+class Animator:
+    """Plays animations by time, keeping the glyphs of every running animation in one glyph_dt table.
+
+    Each frame draws the glyphs due at that moment with a single array assignment, and glyphs that are over are
+    dropped from the table, so many effects at once cost about as much as one.
+    """
+
+    def __init__(self) -> None:
+        self.table = np.zeros(0, dtype=glyph_dt)  # Times in the table are absolute, from time.perf_counter.
+
+    def __bool__(self) -> bool:
+        """True while anything is left to play."""
+        return len(self.table) > 0
+
+    def add(self, animations: Iterable[BaseAnimation], now: Optional[float] = None) -> None:
+        """Start playing 'animations' at 'now' (the current time if None)."""
+        if now is None:
+            now = time.perf_counter()
+        tables = [animation.glyphs() for animation in animations]
+        if not tables:
+            return
+        new = np.concatenate(tables)
+        new["start"] += now
+        new["end"] += now
+        self.table = np.concatenate((self.table, new))
+
+    def clear(self) -> None:
+        self.table = np.zeros(0, dtype=glyph_dt)
+
+    def render(self, console: Console, x_offset: int, y_offset: int, now: Optional[float] = None) -> None:
+        """Draw the glyphs shown at 'now' onto 'console', with map tiles shifted by the viewport offsets."""
+        if now is None:
+            now = time.perf_counter()
+        self.table = self.table[self.table["end"] > now]
+
+        x = self.table["x"] + x_offset
+        y = self.table["y"] + y_offset
+        shown = (
+            (self.table["start"] <= now)
+            & (0 <= x) & (x < console.width)
+            & (0 <= y) & (y < console.height)
+        )
+        rows = np.zeros(np.count_nonzero(shown), dtype=console.rgba.dtype)
+        rows["ch"] = self.table["ch"][shown]
+        rows["fg"] = self.table["fg"][shown]
+        console.rgba[x[shown], y[shown]] = rows
 
 class AttackAnimation(BaseAnimation):
     """Render a burst coming out of the target, in the opposite direction of the attacker."""
@@ -29,132 +132,40 @@ class AttackAnimation(BaseAnimation):
 
         self.x = entity.x
         self.y = entity.y
+        self.direction = (int(np.sign(attacker.x - entity.x)), int(np.sign(attacker.y - entity.y)))
 
-        if attacker.x > entity.x and attacker.y == entity.y:
-            self.attacker_location = 'right'
-        elif attacker.x < entity.x and attacker.y == entity.y:
-            self.attacker_location = 'left'
-        elif attacker.x == entity.x and attacker.y > entity.y:
-            self.attacker_location = 'below'
-        elif attacker.x == entity.x and attacker.y < entity.y:
-            self.attacker_location = 'above'
-        elif attacker.x > entity.x and attacker.y > entity.y:
-            self.attacker_location = 'below_right'
-        elif attacker.x > entity.x and attacker.y < entity.y:
-            self.attacker_location = 'above_right'
-        elif attacker.x < entity.x and attacker.y > entity.y:
-            self.attacker_location = 'below_left'
-        elif attacker.x < entity.x and attacker.y < entity.y:
-            self.attacker_location = 'above_left'
-    
-    def anim_render(self, console: Console, engine: Engine) -> bool:
-        x_offset = engine.viewport.x_offset
-        y_offset = engine.viewport.y_offset
-
-        if self.attacker_location == 'right':
-            console.print(x=self.x+x_offset-1, y=self.y+y_offset, string=chr(0xE104), fg=[255, 0, 0])
-            console.print(x=self.x+x_offset-1, y=self.y+y_offset+1, string=chr(0xE107), fg=[255, 0, 0])
-            console.print(x=self.x+x_offset-1, y=self.y+y_offset-1, string=chr(0xE105), fg=[255, 0, 0])
-        elif self.attacker_location == 'left':
-            console.print(x=self.x+x_offset+1, y=self.y+y_offset, string=chr(0xE103), fg=[255, 0, 0])
-            console.print(x=self.x+x_offset+1, y=self.y+y_offset-1, string=chr(0xE106), fg=[255, 0, 0])
-            console.print(x=self.x+x_offset+1, y=self.y+y_offset+1, string=chr(0xE108), fg=[255, 0, 0])
-        elif self.attacker_location == 'below':
-            console.print(x=self.x+x_offset-1, y=self.y+y_offset-1, string=f"{chr(0xE105)}{chr(0xE101)}{chr(0xE106)}", fg=[255, 0, 0])
-        elif self.attacker_location == 'above':
-            console.print(x=self.x+x_offset-1, y=self.y+y_offset+1, string=f"{chr(0xE107)}{chr(0xE102)}{chr(0xE108)}", fg=[255, 0, 0])
-        elif self.attacker_location == 'below_right':
-            console.print(x=self.x+x_offset-1, y=self.y+y_offset-1, string=f"{chr(0xE105)}{chr(0xE101)}", fg=[255, 0, 0])
-            console.print(x=self.x+x_offset-1, y=self.y+y_offset, string=chr(0xE104), fg=[255, 0, 0])
-        elif self.attacker_location == 'above_right':
-            console.print(x=self.x+x_offset-1, y=self.y+y_offset, string=chr(0xE104), fg=[255, 0, 0])
-            console.print(x=self.x+x_offset-1, y=self.y+y_offset+1, string=f"{chr(0xE107)}{chr(0xE102)}", fg=[255, 0, 0])
-        elif self.attacker_location == 'below_left':
-            console.print(x=self.x+x_offset, y=self.y+y_offset-1, string=f"{chr(0xE101)}{chr(0xE106)}", fg=[255, 0, 0])
-            console.print(x=self.x+1+x_offset, y=self.y+y_offset, string=chr(0xE103), fg=[255, 0, 0])
-        elif self.attacker_location == 'above_left':
-            console.print(x=self.x+x_offset+1, y=self.y+y_offset, string=chr(0xE103), fg=[255, 0, 0])
-            console.print(x=self.x+x_offset, y=self.y+y_offset+1, string=f"{chr(0xE102)}{chr(0xE108)}", fg=[255, 0, 0])
-
-
-        self.frames -= 1
-
-        if self.frames == 0:
-            return True
-        else:
-            return False
+    def glyphs(self) -> np.ndarray:
+        return glyph_table(self.x, self.y, ATTACK_GLYPHS.get(self.direction, []), (255, 0, 0), 0, self.duration)
 
 
 class ProjectileAnimation(BaseAnimation):
     """Render a projectile from the origin actor to a given point."""
-    def __init__(self, origin: Actor, target_x: int, target_y: int, color: Optional[Tuple[int, int, int]] = color.white):
-        super().__init__(10)
-        self.origin = origin
-        self.target_x = target_x
-        self.target_y = target_y
+    def __init__(self, origin: Actor, path: List[Tuple[int, int]], color: Optional[Tuple[int, int, int]] = color.white):
+        """'path' is the tiles to fly over after the origin, usually GameMap.trace(...).path."""
+        super().__init__(len(path))
+        self.origin_xy = (origin.x, origin.y)
+        self.path = list(path)
         self.color = color
 
-        self.last_tile = (self.origin.x, self.origin.y)
-
-        self.path = self.get_path_to(self.origin, self.target_x, self.target_y)
-        
-    def get_path_to(self, origin: Actor, dest_x: int, dest_y: int) -> List[Tuple[int, int]]:
-        """Compute and return a path from origin to the target coordinates, ignoring terrain.
-
-        If there is no valid path returns an empty list.
-        """
-
-        # Create a new array the same size as the gamemap, but with all tiles marked as walkable.
-        cost = np.full_like(origin.gamemap.tiles, 1, dtype=np.int8)
-
-        # Create a graph from the cost array and pass that graph to a new pathfinder.
-        graph = tcod.path.SimpleGraph(cost=cost, cardinal=2, diagonal=3)
-        pathfinder = tcod.path.Pathfinder(graph)
-
-        pathfinder.add_root((origin.x, origin.y))  # Set start coordinates.
-
-        # Compute the path to the destination and remove the starting point.
-        path: List[List[int]] = pathfinder.path_to((dest_x, dest_y))[1:].tolist()
-
-        # Convert from List[List[int]] to List[Tuple[int, int]].
-        return [(index[0], index[1]) for index in path]
-
-    def anim_render(self, console: Console, engine: Engine) -> bool:
+    def glyphs(self) -> np.ndarray:
+        """One tile per frame, each drawn with the glyph for the direction the projectile moved in."""
+        tables = []
+        last_tile = self.origin_xy
+        for step, tile_xy in enumerate(self.path):
+            dx, dy = tile_xy[0] - last_tile[0], tile_xy[1] - last_tile[1]
+            if dx and dy:
+                ch = 0xE10C if (dx > 0) == (dy > 0) else 0xE10B
+            elif dx:
+                ch = 0xE109
+            else:
+                ch = 0xE10A
+            tables.append(
+                glyph_table(*tile_xy, [(0, 0, ch)], self.color, step * FRAME_SECONDS, (step + 1) * FRAME_SECONDS)
+            )
+            last_tile = tile_xy
+        return np.concatenate(tables) if tables else super().glyphs()
 
-        x_offset = engine.viewport.x_offset
-        y_offset = engine.viewport.y_offset
 
-        if not self.path:
-            return True
-        
-        tile_xy = self.path.pop(0)
-        if tile_xy[0] == self.origin.x and tile_xy[1] == self.origin.y:
-            return True
-        
-        # print different tiles based on where the projectile is moving
-        if tile_xy[0] != self.last_tile[0]:
-            if tile_xy[1] == self.last_tile[1]:
-                console.print(x=tile_xy[0] + x_offset, y=tile_xy[1] + y_offset, string=chr(0xE109), fg=self.color)
-            elif tile_xy[1] > self.last_tile[1]:
-                if tile_xy[0] > self.last_tile[0]:
-                    console.print(x=tile_xy[0] + x_offset, y=tile_xy[1] + y_offset, string=chr(0xE10C), fg=self.color)
-                else:
-                    console.print(x=tile_xy[0] + x_offset, y=tile_xy[1] + y_offset, string=chr(0xE10B), fg=self.color)
-            else:
-                if tile_xy[0] > self.last_tile[0]:
-                    console.print(x=tile_xy[0] + x_offset, y=tile_xy[1] + y_offset, string=chr(0xE10B), fg=self.color)
-                else:
-                    console.print(x=tile_xy[0] + x_offset, y=tile_xy[1] + y_offset, string=chr(0xE10C), fg=self.color)
-        elif tile_xy[1] != self.last_tile[1]:
-            console.print(x=tile_xy[0] + x_offset, y=tile_xy[1] + y_offset, string=chr(0xE10A), fg=self.color)
-
-        self.last_tile = tile_xy
-        if len(self.path) == 0:
-            return True
-        else:
-            return False
-
-        
 class BurstAnimation(BaseAnimation):
     """Render a burst around the origin actor."""
     def __init__(self, origin: Actor, color: Optional[Tuple[int, int, int]] = color.white):
@@ -163,23 +174,9 @@ class BurstAnimation(BaseAnimation):
         self.color = color
         self.x = self.origin.x
         self.y = self.origin.y
-    
-    def anim_render(self, console: Console, engine: Engine) -> bool:
-        
-        x_offset = engine.viewport.x_offset
-        y_offset = engine.viewport.y_offset
 
-        console.print(x=self.x + x_offset - 1, y=self.y + y_offset - 1, string=f"{chr(0xE105)}{chr(0xE101)}{chr(0xE106)}", fg=self.color)
-        console.print(x=self.x + x_offset - 1, y=self.y + y_offset, string=0xE104, fg=self.color)
-        console.print(x=self.x + x_offset + 1, y=self.y + y_offset, string=0xE103, fg=self.color)
-        console.print(x=self.x + x_offset - 1, y=self.y + y_offset + 1, string=f"{chr(0xE107)}{chr(0xE102)}{chr(0xE108)}", fg=self.color)
-
-        self.frames -= 1
-
-        if self.frames == 0:
-            return True
-        else:
-            return False
+    def glyphs(self) -> np.ndarray:
+        return glyph_table(self.x, self.y, BURST_GLYPHS, self.color, 0, self.duration)
 
 
 class ExplosionAnimation(BaseAnimation):
@@ -190,6 +187,3 @@ class ExplosionAnimation(BaseAnimation):
         self.origin_y = origin_y
         self.radius = radius
         self.color = color
-
-
-
@@ -0,0 +1,30 @@
+"""Image files the game needs, each loaded the first time it is asked for and kept after that."""
+from __future__ import annotations
+
+from functools import lru_cache
+
+import numpy as np  # type: ignore
+import tcod
+
+import tilemaps
+
+
+@lru_cache(maxsize=None)
+def text_tileset() -> tcod.tileset.Tileset:
+    """The font for the UI console."""
+    return tcod.tileset.load_tilesheet(
+        #"dejavu10x10_gs_tc.png", 32, 8, tcod.tileset.CHARMAP_TCOD
+        "Talryth_square_15x15.png", 16, 16, tcod.tileset.CHARMAP_CP437
+    )
+
+
+@lru_cache(maxsize=None)
+def map_tileset() -> tcod.tileset.Tileset:
+    """The graphical tiles for the map consoles."""
+    return tcod.tileset.load_tilesheet("wmss_32x32.png", 10, 10, tilemaps.main_tilemap)
+
+
+@lru_cache(maxsize=None)
+def menu_background() -> np.ndarray:
+    """The main menu background image, without its alpha channel."""
+    return tcod.image.load("menu_background.png")[:, :, :3]
@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+"""Micro benchmarks for the game loop, run without opening a window.
+
+Usage: python benchmarks.py [name ...]
+Runs every benchmark when no names are given.
+"""
+from __future__ import annotations
+
+import json
+import lzma
+import os
+import pickle
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict
+
+from tcod.console import Console
+from tcod.map import compute_fov
+
+from actions import MeleeAction
+from animations import AttackAnimation
+from combat import resolve_rounds
+from engine import Engine, FOV_RADIUS
+import entity_factories
+from game_map import GameMap, GameWorld
+import input_handlers
+from message_log import MessageLog, QUIET, VERBOSE
+import savefile
+import dice
+from rng import RNG
+import tile_types
+from viewport import Viewport
+
+
+BENCHMARKS: Dict[str, Callable[[], None]] = {}
+
+
+def benchmark(func: Callable[[], None]) -> Callable[[], None]:
+    """Register a benchmark under its function name."""
+    BENCHMARKS[func.__name__] = func
+    return func
+
+
+def build_arena(map_width: int, map_height: int, monsters: int, seed: int = 0) -> Engine:
+    """Return an Engine on an open rectangular map crowded with goblins."""
+    rng = random.Random(seed)
+
+    player = entity_factories.player.build()
+    player.fighter.heal(player.fighter.max_hp)
+
+    engine = Engine(player=player, seed=seed)
+    engine.game_world = GameWorld(
+        engine=engine,
+        max_rooms=0,
+        room_min_size=0,
+        room_max_size=0,
+        map_width=map_width,
+        map_height=map_height,
+        current_floor=1,
+    )
+
+    game_map = GameMap(engine, map_width, map_height)
+    game_map.tiles[1:-1, 1:-1] = tile_types.floor
+    engine.game_map = game_map
+    engine.game_world.floors[1] = game_map
+
+    player.place(map_width // 2, map_height // 2, game_map)
+
+    for prototype in (entity_factories.dagger, entity_factories.leather_armor):
+        item = prototype.build()
+        player.inventory.add(item)
+        player.equipment.toggle_equip(item, add_message=False)
+
+    spawned = 0
+    while spawned < monsters:
+        x = rng.randint(1, map_width - 2)
+        y = rng.randint(1, map_height - 2)
+        if not game_map.get_entities_at_location(x, y):
+            entity_factories.goblin.spawn(game_map, x, y)
+            spawned += 1
+
+    engine.viewport = Viewport(engine=engine)
+    engine.update_fov()
+    return engine
+
+
+def report(name: str, seconds: float, count: int, unit: str) -> None:
+    print(f"{name}: {count} {unit} in {seconds:.3f}s ({seconds / count * 1e6:.1f} us/{unit[:-1]})")
+
+
+# Run in a fresh interpreter: import the game, load the tilesets and draw the main menu, printing the time of each.
+STARTUP_SCRIPT = """
+import json, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+main.assets.text_tileset()
+main.assets.map_tileset()
+loaded = time.perf_counter()
+from tcod.console import Console
+consoles = [Console(80, 50, order="F") for _ in range(5)]
+main.input_handlers.MainMenu().on_render(*consoles)
+drawn = time.perf_counter()
+print(json.dumps({"imports": imported - start, "tilesets": loaded - imported, "menu_frame": drawn - loaded}))
+"""
+
+
+@benchmark
+def startup() -> None:
+    """Cold starts up to the first main menu frame, without opening a window."""
+    starts = 10
+    totals: Dict[str, float] = {}
+    for _ in range(starts):
+        output = subprocess.run(
+            [sys.executable, "-W", "ignore", "-c", STARTUP_SCRIPT],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        for step, seconds in json.loads(output).items():
+            totals[step] = totals.get(step, 0.0) + seconds
+    for step, seconds in totals.items():
+        report(f"startup.{step}", seconds, starts, "starts")
+    report("startup.total", sum(totals.values()), starts, "starts")
+
+
+@benchmark
+def entity_lookup() -> None:
+    """Location lookups and full enemy turns on a map with 2,000+ entities."""
+    engine = build_arena(map_width=200, map_height=200, monsters=2500)
+    game_map = engine.game_map
+    rng = random.Random(1)
+    points = [(rng.randint(0, 199), rng.randint(0, 199)) for _ in range(100_000)]
+
+    start = time.perf_counter()
+    for x, y in points:
+        game_map.get_blocking_entity_at_location(x, y)
+        game_map.get_actor_at_location(x, y)
+    report("entity_lookup.locations", time.perf_counter() - start, len(points), "lookups")
+
+    turns = 50
+    start = time.perf_counter()
+    for _ in range(turns):
+        engine.player.fighter.heal(engine.player.fighter.max_hp)
+        engine.handle_enemy_turns()
+        engine.update_fov()
+    report("entity_lookup.turns", time.perf_counter() - start, turns, "turns")
+
+
+@benchmark
+def enemy_turns() -> None:
+    """Enemy turn time as the number of chasing monsters grows."""
+    for monsters in (100, 400, 1600):
+        engine = build_arena(map_width=120, map_height=120, monsters=monsters)
+        turns = 20
+        start = time.perf_counter()
+        for _ in range(turns):
+            engine.player.fighter.heal(engine.player.fighter.max_hp)
+            engine.handle_enemy_turns()
+            engine.update_fov()
+        report(f"enemy_turns.{monsters}", time.perf_counter() - start, turns, "turns")
+
+
+@benchmark
+def fov() -> None:
+    """FOV updates on a 1000x1000 map, half of them waits, against a full-map compute_fov."""
+    engine = build_arena(map_width=1000, map_height=1000, monsters=0)
+    player = engine.player
+    turns = 200
+
+    start = time.perf_counter()
+    for turn in range(turns):
+        if turn % 2:
+            player.move(1 if turn % 4 == 1 else -1, 0)
+        engine.update_fov()
+    report("fov.update_fov", time.perf_counter() - start, turns, "turns")
+
+    start = time.perf_counter()
+    for _ in range(turns):
+        compute_fov(engine.game_map.tiles["transparent"], (player.x, player.y), radius=FOV_RADIUS)
+    report("fov.full_map", time.perf_counter() - start, turns, "turns")
+
+
+@benchmark
+def render_entities() -> None:
+    """Drawing a crowded floor where every entity is in view."""
+    engine = build_arena(map_width=120, map_height=120, monsters=2000)
+    engine.game_map.visible[:] = True
+
+    console_size = (engine.game_map.width, engine.game_map.height)
+    b_console, i_console, m_console = (Console(*console_size, order="F") for _ in range(3))
+
+    frames = 100
+    start = time.perf_counter()
+    for _ in range(frames):
+        engine.viewport.render(b_console, i_console, m_console)
+    report("render_entities", time.perf_counter() - start, frames, "frames")
+
+
+@benchmark
+def menus() -> None:
+    """Frames drawn while the inventory and character screens are open over a crowded floor."""
+    engine = build_arena(map_width=120, map_height=120, monsters=2000)
+    engine.game_map.visible[:] = True
+    for prototype in (entity_factories.health_kit, entity_factories.health_kit, entity_factories.lightning_scroll):
+        engine.player.inventory.add(prototype.build())
+
+    console_size = (engine.game_map.width, engine.game_map.height)
+    consoles = [Console(*console_size, order="F") for _ in range(5)]
+
+    frames = 200
+    for handler in (input_handlers.InventoryActivateHandler(engine), input_handlers.CharacterScreenEventHandler(engine)):
+        start = time.perf_counter()
+        for frame in range(frames):
+            if frame % 20 == 0 and isinstance(handler, input_handlers.InventoryEventHandler):
+                handler.cursor = (handler.cursor + 1) % handler.number_of_items_in_inventory
+            handler.on_render(*consoles)
+        report(f"menus.{type(handler).__name__}", time.perf_counter() - start, frames, "frames")
+
+    popup = input_handlers.PopupMessage(input_handlers.MainGameEventHandler(engine), "Are you sure you want to quit?")
+    start = time.perf_counter()
+    for _ in range(frames):
+        popup.on_render(*consoles)
+    report("menus.PopupMessage", time.perf_counter() - start, frames, "frames")
+
+
+@benchmark
+def animations() -> None:
+    """Drawing frames while dozens of hit effects play at once."""
+    engine = build_arena(map_width=120, map_height=120, monsters=2000)
+    player = engine.player
+    goblins = [actor for actor in engine.game_map.actors if actor is not player][:50]
+    a_console = Console(engine.game_map.width, engine.game_map.height, order="F")
+
+    frames = 1000
+    engine.animator.add([AttackAnimation(goblin, player) for goblin in goblins], now=0)
+    start = time.perf_counter()
+    for _ in range(frames):
+        engine.animator.render(a_console, 0, 0, now=0)
+    report(f"animations.{len(goblins)}", time.perf_counter() - start, frames, "frames")
+
+
+@benchmark
+def message_log() -> None:
+    """A long run's worth of combat messages, each followed by drawing the log like a frame does."""
+    log = MessageLog()
+    console = Console(80, 50, order="F")
+    rng = random.Random(1)
+
+    messages = 100_000
+    start = time.perf_counter()
+    for turn in range(messages):
+        log.add_message(f"The goblin hits you for {rng.randint(1, 8)} damage! (turn {turn})")
+        log.render(console=console, x=21, y=45, width=40, height=5)
+    report("message_log", time.perf_counter() - start, messages, "messages")
+    print(f"message_log.kept: {len(log.messages)} messages")
+
+
+@benchmark
+def floor_generation() -> None:
+    """Generating deep floors, where most of the time goes into spawning monsters and items."""
+    engine = build_arena(map_width=100, map_height=60, monsters=0)
+    engine.game_world.max_rooms = 30
+    engine.game_world.room_min_size = 6
+    engine.game_world.room_max_size = 10
+
+    floors = 50
+    start = time.perf_counter()
+    for _ in range(floors):
+        engine.game_world.create_floor(9)
+    report("floor_generation", time.perf_counter() - start, floors, "floors")
+
+
+@benchmark
+def stairs() -> None:
+    """Taking the stairs down, with a short pause on each floor like a player would take."""
+    engine = build_arena(map_width=100, map_height=60, monsters=0)
+    game_world = engine.game_world
+    game_world.max_rooms = 30
+    game_world.room_min_size = 6
+    game_world.room_max_size = 10
+
+    floors = 20
+    elapsed = 0.0
+    for _ in range(floors):
+        time.sleep(0.05)
+        start = time.perf_counter()
+        game_world.change_floor(game_world.current_floor + 1)
+        elapsed += time.perf_counter() - start
+    report("stairs", elapsed, floors, "descents")
+
+
+@benchmark
+def dice_rolls() -> None:
+    """Rolling 2d8+3 damage with a 10% critical chance, one expression at a time against one batch."""
+    rng = RNG(0)
+    rolls = 100_000
+    critical = rng.dice.random(rolls) < 0.1
+
+    start = time.perf_counter()
+    for is_critical in critical:
+        damage = dice.dice_roller(2, 8, rng.combat) + (6 if is_critical else 3)
+        if is_critical:
+            damage += dice.dice_roller(1, 8, rng.combat)
+    report("dice_rolls.dice_roller", time.perf_counter() - start, rolls, "rolls")
+
+    start = time.perf_counter()
+    dice.roll_damage(2, 8, 3, critical, rng.dice, deadly_dice=1, deadly_size=8)
+    report("dice_rolls.roll_damage", time.perf_counter() - start, rolls, "rolls")
+
+
+@benchmark
+def area_queries() -> None:
+    """Fireball sized radius queries on a crowded floor, against looping over every actor."""
+    engine = build_arena(map_width=120, map_height=120, monsters=2000)
+    game_map = engine.game_map
+    rng = random.Random(1)
+    points = [(rng.randint(0, 119), rng.randint(0, 119)) for _ in range(1000)]
+
+    start = time.perf_counter()
+    for x, y in points:
+        [actor for actor in game_map.actors if actor.distance(x, y) <= 3]
+    report("area_queries.loop", time.perf_counter() - start, len(points), "lookups")
+
+    start = time.perf_counter()
+    for x, y in points:
+        game_map.actors_within_radius(x, y, 3)
+    report("area_queries.actors_within_radius", time.perf_counter() - start, len(points), "lookups")
+
+
+@benchmark
+def melee_rounds() -> None:
+    """Whole melee rounds of an ogre against the player, through MeleeAction at each log verbosity and batched."""
+    engine = build_arena(map_width=20, map_height=20, monsters=0)
+    player = engine.player
+    ogre = entity_factories.ogre.spawn(engine.game_map, player.x + 1, player.y)
+    player.fighter.ancestry.hp_boost += 100_000  # So the ogre never kills the player.
+
+    for name, verbosity in (("verbose", VERBOSE), ("quiet", QUIET)):
+        engine.message_log.verbosity = verbosity
+        rounds = 5_000
+        start = time.perf_counter()
+        for _ in range(rounds):
+            player.fighter.heal(player.fighter.max_hp)
+            MeleeAction(ogre, -1, 0).perform()
+        report(f"melee_rounds.melee_action.{name}", time.perf_counter() - start, rounds, "rounds")
+
+    rounds = 100_000
+    start = time.perf_counter()
+    resolve_rounds(ogre.fighter.attack_profile, player.fighter.ac, engine.rng.dice, rounds)
+    report("melee_rounds.resolve_rounds", time.perf_counter() - start, rounds, "rounds")
+
+
+@benchmark
+def save_load() -> None:
+    """Saving and loading a large floor with each compressor, against the old pickle + lzma saves."""
+    engine = build_arena(map_width=400, map_height=400, monsters=2000)
+    engine.game_map.explored[:200] = True
+    rounds = 5
+
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "benchmark.sav")
+
+        start = time.perf_counter()
+        for _ in range(rounds):
+            with open(filename, "wb") as f:
+                f.write(lzma.compress(pickle.dumps(engine)))
+        report("save_load.pickle_lzma.save", time.perf_counter() - start, rounds, "saves")
+        size = os.path.getsize(filename)
+        start = time.perf_counter()
+        for _ in range(rounds):
+            with open(filename, "rb") as f:
+                pickle.loads(lzma.decompress(f.read()))
+        report("save_load.pickle_lzma.load", time.perf_counter() - start, rounds, "loads")
+        print(f"save_load.pickle_lzma.size: {size} bytes")
+
+        for compressor in savefile.COMPRESSORS:
+            start = time.perf_counter()
+            for _ in range(rounds):
+                savefile.save(engine, filename, compressor)
+            report(f"save_load.{compressor}.save", time.perf_counter() - start, rounds, "saves")
+            start = time.perf_counter()
+            for _ in range(rounds):
+                savefile.load(filename)
+            report(f"save_load.{compressor}.load", time.perf_counter() - start, rounds, "loads")
+            print(f"save_load.{compressor}.size: {os.path.getsize(filename)} bytes")
+
+
+def main(names: list[str]) -> None:
+    for name in names or BENCHMARKS:
+        BENCHMARKS[name]()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
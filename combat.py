@@ -0,0 +1,161 @@
+"""Melee attack resolution from compiled attack profiles, one round at a time or many rounds as arrays.
+
+The game resolves one round per MeleeAction, which is what resolve_round is for: plain Python on the combat RNG,
+faster than the array setup for a single round. resolve_rounds only pays off over thousands of rounds, so it is
+meant for batch use such as balance simulations and the melee_rounds benchmark, not for the turn loop.
+"""
+from __future__ import annotations
+
+from random import Random
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np  # type: ignore
+
+from dice import dice_roller, roll_damage
+from equipment_types import EquipmentTraits
+
+# [to hit, number of dice, die size, damage bonus, equipment traits, critical dice (number, size) or None]
+AttackInfo = Tuple[int, int, int, int, Optional[Sequence[EquipmentTraits]], Optional[Tuple[int, int]]]
+
+# [natural roll, to hit, damage (0 is a miss), critical]
+Swing = Tuple[int, int, int, bool]
+
+
+class CompiledAttack:
+    """One attack option with its traits turned into flags and modifiers."""
+
+    def __init__(self, attack_info: AttackInfo, finesse_bonus: int = 0):
+        to_hit, num_dice, die_size, damage_bonus, traits, crit_bonus = attack_info
+        traits = set(traits or ())
+        crit_dice, crit_size = crit_bonus if crit_bonus is not None else (0, 0)
+
+        self.to_hit = to_hit + (finesse_bonus if EquipmentTraits.FINESSE in traits else 0)
+        self.num_dice = num_dice
+        self.die_size = die_size
+        self.damage_bonus = damage_bonus
+        # Subtracted from the -5 to hit per earlier swing.
+        self.penalty_reduction = (EquipmentTraits.AGILE in traits) + (EquipmentTraits.SWEEP in traits)
+        self.backswing = EquipmentTraits.BACKSWING in traits
+        self.forceful = EquipmentTraits.FORCEFUL in traits
+        self.fatal_size = crit_size if EquipmentTraits.FATAL in traits else 0  # 0 for attacks without FATAL.
+        self.deadly_dice = crit_dice if EquipmentTraits.DEADLY in traits else 0  # 0 for attacks without DEADLY.
+        self.deadly_size = crit_size
+
+
+class AttackProfile:
+    """An attacker's attack options compiled once, as CompiledAttacks and as arrays for resolve_rounds.
+
+    Built by BaseStats.attack_profile and thrown away when equipment or level changes.
+    """
+
+    def __init__(self, options: Sequence[AttackInfo], attacks_per_round: int, finesse_bonus: int = 0):
+        """'finesse_bonus' is added to the to-hit of FINESSE attacks."""
+        self.attacks_per_round = attacks_per_round
+        self.attacks = [CompiledAttack(attack_info, finesse_bonus) for attack_info in options]
+
+        for name in (
+            "to_hit", "num_dice", "die_size", "damage_bonus", "penalty_reduction", "fatal_size", "deadly_dice", "deadly_size"
+        ):
+            setattr(self, name, np.array([getattr(attack, name) for attack in self.attacks], dtype=np.int64))
+        self.backswing = np.array([attack.backswing for attack in self.attacks], dtype=bool)
+        self.forceful = np.array([attack.forceful for attack in self.attacks], dtype=bool)
+
+
+def resolve_round(profile: AttackProfile, target_ac: int, rng: Random) -> List[Swing]:
+    """Roll one round of attacks against 'target_ac' with plain Python, which is fastest for a single round.
+
+    Every swing of the round is rolled, also the ones after a killing blow, callers stop applying them there.
+    Each swing after the first takes -5 to hit per earlier swing, less one for AGILE and SWEEP attacks and one
+    more for BACKSWING attacks right after a miss. FORCEFUL adds the weapon dice to damage per earlier swing.
+    """
+    swings = []
+    last_missed = True
+    for i in range(profile.attacks_per_round):
+        if len(profile.attacks) > 1:
+            # Monsters pick an attack every swing.
+            attack = profile.attacks[dice_roller(1, len(profile.attacks), rng) - 1]
+        else:
+            attack = profile.attacks[0]
+
+        to_hit = attack.to_hit - i * (5 - attack.penalty_reduction - (attack.backswing and last_missed))
+        damage_bonus = attack.damage_bonus + (i * attack.num_dice if attack.forceful else 0)
+
+        nat_roll = dice_roller(1, 20, rng)
+        attack_roll = nat_roll + to_hit
+
+        # if attack roll exceeds ac by 10 or more, or is a nat 20 that hits, it is a critical
+        critical = attack_roll >= target_ac and (attack_roll - target_ac >= 10 or nat_roll == 20)
+        if critical:
+            if attack.fatal_size:
+                damage = dice_roller(attack.num_dice + 1, attack.fatal_size, rng)
+            else:
+                damage = dice_roller(attack.num_dice, attack.die_size, rng)
+            damage += damage_bonus * 2 + dice_roller(attack.deadly_dice, attack.deadly_size, rng)
+        # a nat 20 always hits
+        elif attack_roll >= target_ac or nat_roll == 20:
+            damage = dice_roller(attack.num_dice, attack.die_size, rng) + damage_bonus
+        else:
+            damage = 0
+
+        swings.append((nat_roll, to_hit, damage, critical))
+        last_missed = damage <= 0
+
+    return swings
+
+
+class RoundResults:
+    """The swings of one or more rounds, each array shaped (rounds, attacks per round)."""
+
+    def __init__(self, nat_roll: np.ndarray, to_hit: np.ndarray, damage: np.ndarray, critical: np.ndarray):
+        self.nat_roll = nat_roll
+        self.to_hit = to_hit
+        self.damage = damage  # 0 or less is a miss.
+        self.critical = critical
+
+
+def resolve_rounds(profile: AttackProfile, target_ac: int, rng: np.random.Generator, rounds: int) -> RoundResults:
+    """Roll 'rounds' independent rounds of attacks against 'target_ac' as arrays, for simulations.
+
+    Follows the same rules as resolve_round.
+    """
+    swings = profile.attacks_per_round
+    shape = (rounds, swings)
+    swing = np.arange(swings)
+
+    if len(profile.attacks) > 1:
+        choice = rng.integers(0, len(profile.attacks), size=shape)
+    else:
+        choice = np.zeros(shape, dtype=np.int64)
+    nat_roll = rng.integers(1, 20, size=shape, endpoint=True)
+
+    base_to_hit = profile.to_hit[choice] - swing * (5 - profile.penalty_reduction[choice])
+    backswing_bonus = swing * profile.backswing[choice]
+    num_dice = profile.num_dice[choice]
+
+    # Normal and critical damage of every swing, rolled as one batch before knowing which one is needed.
+    normal_damage, critical_damage = roll_damage(
+        num_dice,
+        profile.die_size[choice],
+        profile.damage_bonus[choice] + swing * num_dice * profile.forceful[choice],
+        np.array([False, True])[:, np.newaxis, np.newaxis],
+        rng,
+        fatal_size=profile.fatal_size[choice],
+        deadly_dice=profile.deadly_dice[choice],
+        deadly_size=profile.deadly_size[choice],
+    )
+
+    # Only BACKSWING depends on the swing before, so this walks the (few) swings and not the rounds.
+    to_hit = np.empty(shape, dtype=np.int64)
+    damage = np.zeros(shape, dtype=np.int64)
+    critical = np.zeros(shape, dtype=bool)
+    last_missed = np.ones(rounds, dtype=bool)
+    for i in range(swings):
+        to_hit[:, i] = base_to_hit[:, i] + np.where(last_missed, backswing_bonus[:, i], 0)
+        attack_roll = nat_roll[:, i] + to_hit[:, i]
+        natural_20 = nat_roll[:, i] == 20
+        critical[:, i] = (attack_roll >= target_ac) & ((attack_roll - target_ac >= 10) | natural_20)
+        hit = (attack_roll >= target_ac) | natural_20
+        damage[:, i] = np.where(critical[:, i], critical_damage[:, i], np.where(hit, normal_damage[:, i], 0))
+        last_missed = damage[:, i] <= 0
+
+    return RoundResults(nat_roll, to_hit, damage, critical)
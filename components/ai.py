@@ -1,6 +1,5 @@
 from __future__ import annotations
 
-import random
 from typing import List, Optional, Tuple, TYPE_CHECKING
 
 import numpy as np  # type: ignore
@@ -10,27 +9,84 @@ from actions import Action, BumpAction, MeleeAction, MovementAction, WaitAction
 
 if TYPE_CHECKING:
     from entity import Actor
+    from game_map import GameMap
+
+
+def movement_cost(game_map: GameMap, window: Tuple[slice, slice] = (slice(None), slice(None))) -> np.ndarray:
+    """Return a pathing cost array for the map (or a window of it), with extra cost on tiles holding a blocking entity."""
+    # Copy the walkable array from the GameMap.
+    cost = np.array(game_map.tiles["walkable"][window], dtype=np.int8)
+    x_min, _, _ = window[0].indices(game_map.width)
+    y_min, _, _ = window[1].indices(game_map.height)
+    width, height = cost.shape
+
+    for (x, y), entities in game_map.entity_index.items():
+        x -= x_min
+        y -= y_min
+        if not (0 <= x < width and 0 <= y < height):
+            continue
+        # Check that an entity blocks movement and the cost isn't zero (blocking).
+        if cost[x, y] and any(entity.blocks_movement for entity in entities):
+            # Add to the cost of a blocked position.
+            # A lower number means more enemies will crowd behind each other in hallways.
+            # A higher number means enemies will take longer paths in order to surround the player.
+            cost[x, y] += 10
+
+    return cost
+
+
+class FlowField:
+    """Distance to a single target from every tile around it, shared by all the AIs chasing that target.
+
+    Only a square of 'radius' tiles around the target is searched, which is plenty for monsters that can see it.
+    """
+
+    def __init__(self, game_map: GameMap, target_x: int, target_y: int, radius: int = 32):
+        self.x_min = max(0, target_x - radius)
+        self.y_min = max(0, target_y - radius)
+        window = (
+            slice(self.x_min, min(game_map.width, target_x + radius + 1)),
+            slice(self.y_min, min(game_map.height, target_y + radius + 1)),
+        )
+
+        cost = movement_cost(game_map, window)
+        self.distance = tcod.path.maxarray(cost.shape, order="F")
+        self.distance[target_x - self.x_min, target_y - self.y_min] = 0
+        tcod.path.dijkstra2d(self.distance, cost, cardinal=2, diagonal=3, out=self.distance)
+
+    def path_from(self, x: int, y: int) -> List[Tuple[int, int]]:
+        """Follow the gradient from (x, y) down to the target.
+
+        If the target can't be reached returns an empty list.
+        """
+        x -= self.x_min
+        y -= self.y_min
+        width, height = self.distance.shape
+        if not (0 <= x < width and 0 <= y < height):
+            return []
+
+        path = tcod.path.hillclimb2d(self.distance, (x, y), True, True)[1:]
+        path += (self.x_min, self.y_min)
+
+        # Convert from List[List[int]] to List[Tuple[int, int]].
+        return [(index[0], index[1]) for index in path.tolist()]
 
 
 class BaseAI(Action):
     def perform(self) -> None:
         raise NotImplementedError()
 
+    @property
+    def can_sleep(self) -> bool:
+        """True if the actor has nothing to do until the player comes near, so it can be parked."""
+        return False
+
     def get_path_to(self, dest_x: int, dest_y: int) -> List[Tuple[int, int]]:
         """Compute and return a path to the target coordinates.
 
         If there is no valid path returns an empty list.
         """
-        # Copy the walkable array from the GameMap.
-        cost = np.array(self.entity.gamemap.tiles["walkable"], dtype=np.int8)
-
-        for entity in self.entity.gamemap.entities:
-            # Check that an entity blocks movement and the cost isn't zero (blocking).
-            if entity.blocks_movement and cost[entity.x, entity.y]:
-                # Add to the cost of a blocked position.
-                # A lower number means more enemies will crowd behind each other in hallways.
-                # A higher number means enemies will take longer paths in order to surround the player.
-                cost[entity.x, entity.y] += 10
+        cost = movement_cost(self.entity.gamemap)
 
         # Create a graph from the cost array and pass that graph to a new pathfinder.
         graph = tcod.path.SimpleGraph(cost=cost, cardinal=2, diagonal=3)
@@ -63,7 +119,7 @@ class ConfusedEnemy(BaseAI):
             self.entity.ai = self.previous_ai
         else:
             # Pick a random direction
-            direction_x, direction_y = random.choice(
+            direction_x, direction_y = self.engine.rng.ai.choice(
                 [
                     (-1, -1),  # Northwest
                     (0, -1),  # North
@@ -88,6 +144,11 @@ class HostileEnemy(BaseAI):
         super().__init__(entity)
         self.path: List[Tuple[int,int]] = []
 
+    @property
+    def can_sleep(self) -> bool:
+        # Without a path it only waits for the player to come into view.
+        return not self.path
+
     def perform(self) -> None:
         target = self.engine.player
         dx = target.x - self.entity.x
@@ -98,7 +159,8 @@ class HostileEnemy(BaseAI):
             if distance <= 1:
                 return MeleeAction(self.entity, dx, dy).perform()
 
-            self.path = self.get_path_to(target.x, target.y)
+            # Every hostile chases the player, so they all share the engine's flow field.
+            self.path = self.engine.flow_field.path_from(self.entity.x, self.entity.y)
 
         if self.path:
             dest_x, dest_y = self.path.pop(0)
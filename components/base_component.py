@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+from typing import Any, Callable, TYPE_CHECKING
 
 if TYPE_CHECKING:
     from engine import Engine
@@ -8,13 +8,40 @@ if TYPE_CHECKING:
     from game_map import GameMap
 
 
+def derived_stat(func: Callable[[Any], Any]) -> property:
+    """A property whose value is cached on the component until its fighter's invalidate_derived_stats is called.
+
+    For stats computed from equipment, level, ancestry and class, which combat reads many times per attack.
+    """
+    name = func.__name__
+
+    def getter(self: BaseComponent) -> Any:
+        cache = self.__dict__.get("_derived_stats")
+        if cache is None:
+            cache = self._derived_stats = {}
+        elif name in cache:
+            return cache[name]
+        value = cache[name] = func(self)
+        return value
+
+    getter.__doc__ = func.__doc__
+    return property(getter)
+
+
 class BaseComponent:
     parent: Entity  # Owning entity instance.
 
+    # Attributes holding values derived from the rest of the component, left out of save files.
+    cached_attributes: tuple[str, ...] = ("_derived_stats",)
+
     @property
     def gamemap(self) -> GameMap:
         return self.parent.gamemap
 
     @property
     def engine(self) -> Engine:
-        return self.gamemap.engine
\ No newline at end of file
+        return self.gamemap.engine
+
+    def clear_derived_stats(self) -> None:
+        """Drop the cached values of this component's derived_stat properties."""
+        self.__dict__.pop("_derived_stats", None)
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from typing import TYPE_CHECKING
 
-from components.base_component import BaseComponent
+from components.base_component import BaseComponent, derived_stat
 
 if TYPE_CHECKING:
     from fighter import Player
@@ -39,7 +39,7 @@ class BaseClass(BaseComponent):
 
         self.class_id = class_id
 
-    @property
+    @derived_stat
     def attacks_per_round(self) -> int:
         """Each character gets 1 extra attack for every five levels, plus any extra attacks from their weapons."""
         return (1 + (self.parent.parent.level.current_level // 5)) + self.parent.parent.equipment.extra_attacks
@@ -69,7 +69,7 @@ class Fighter(BaseClass):
         )
 
     
-    @property
+    @derived_stat
     def class_damage_bonus(self) -> int:
         if self.parent.parent.level.current_level >= 7 and self.parent.parent.level.current_level < 15:
             if self.parent.parent.equipment.weapon_prof_bonus == 4:
@@ -1,8 +1,7 @@
 from __future__ import annotations
 
-from typing import Optional, TYPE_CHECKING, Tuple, List
+from typing import Optional, TYPE_CHECKING, Tuple
 
-import numpy as np
 import actions
 import color
 import components.ai
@@ -10,9 +9,7 @@ import components.inventory
 from components.base_component import BaseComponent
 from exceptions import Impossible
 import input_handlers
-import random
 from dice import dice_roller
-import tcod.path
 import animations
 
 if TYPE_CHECKING:
@@ -38,7 +35,7 @@ class Consumable(BaseComponent):
         entity = self.parent
         inventory = entity.parent
         if isinstance(inventory, components.inventory.Inventory):
-            inventory.items.remove(entity)
+            inventory.remove(entity)
 
 
 class ConfusionConsumable(Consumable):
@@ -127,15 +124,14 @@ class RadiusDamageConsumable(Consumable):
             raise Impossible("You cannot target an area you cannot see.")
 
         targets_hit = False
-        damage = dice_roller(self.num_dice, self.die_size)
+        damage = dice_roller(self.num_dice, self.die_size, self.engine.rng.combat)
 
-        for actor in self.engine.game_map.actors:
-            if actor.distance(*target_xy) <= self.radius:
-                self.engine.message_log.add_message(
-                    f"The {actor.name} is engulfed in a fiery explosion, taking {damage} damage!"
-                )
-                actor.fighter.take_damage(damage)
-                targets_hit = True
+        for actor in self.engine.game_map.actors_within_radius(*target_xy, self.radius):
+            self.engine.message_log.add_message(
+                f"The {actor.name} is engulfed in a fiery explosion, taking {damage} damage!"
+            )
+            actor.fighter.take_damage(damage)
+            targets_hit = True
 
         if not targets_hit:
             raise Impossible("There are no targets in the radius.")
@@ -157,19 +153,12 @@ class SingleTargetDamageConsumable(Consumable):
 
     def activate(self, action: actions.ItemAction) -> Optional[animations.BurstAnimation]:
         consumer = action.entity
-        target = None
-        closest_distance = self.maximum_range + 1.0
-
-        for actor in self.engine.game_map.actors:
-            if actor is not consumer and self.parent.gamemap.visible[actor.x, actor.y]:
-                distance = consumer.distance(actor.x, actor.y)
-
-                if distance < closest_distance:
-                    target = actor
-                    closest_distance = distance
+        target = self.engine.game_map.nearest_visible_actor(
+            consumer.x, consumer.y, self.maximum_range + 1.0, exclude=consumer
+        )
 
         if target:
-            damage = dice_roller(self.num_dice, self.die_size)
+            damage = dice_roller(self.num_dice, self.die_size, self.engine.rng.combat)
 
             self.engine.message_log.add_message(
                 f"A lightning bolt strikes the {target.name}, dealing {damage} damage!"
@@ -209,26 +198,6 @@ class ProjectileConsumable(Consumable):
             callback=lambda xy: actions.ItemAction(consumer, self.parent, xy),
         )
 
-    def get_path_to(self, origin: Actor, dest_x: int, dest_y: int) -> List[Tuple[int, int]]:
-        """Compute and return a path from origin to the target coordinates, ignoring terrain.
-
-        If there is no valid path returns an empty list.
-        """
-        # Create a new array the same size as the gamemap, but with all tiles marked as walkable.
-        cost = np.full_like(origin.gamemap.tiles, 1, dtype=np.int8)
-
-        # Create a graph from the cost array and pass that graph to a new pathfinder.
-        graph = tcod.path.SimpleGraph(cost=cost, cardinal=2, diagonal=3)
-        pathfinder = tcod.path.Pathfinder(graph)
-
-        pathfinder.add_root((origin.x, origin.y))  # Set start coordinates.
-
-        # Compute the path to the destination and remove the starting point.
-        path: List[List[int]] = pathfinder.path_to((dest_x, dest_y))[1:].tolist()
-
-        # Convert from List[List[int]] to List[Tuple[int, int]].
-        return [(index[0], index[1]) for index in path]
-
     def activate(self, action: actions.ItemAction) -> animations.ProjectileAnimation:
         consumer = action.entity
         target = action.target_xy
@@ -240,44 +209,28 @@ class ProjectileConsumable(Consumable):
         if target[0] == consumer.x and target[1] == consumer.y:
             raise Impossible("You cannot target yourself!")
 
-        path = self.get_path_to(consumer, target[0], target[1])
+        trace = self.engine.game_map.trace(consumer.x, consumer.y, *target)
+
+        if trace.hit_wall:
+            self.engine.message_log.add_message(
+                f"The {self.parent.name} strikes a wall."
+            )
+
+        self.consume()
+        if self.reusable:
+            self.parent.place(*trace.end, self.engine.game_map)
 
-        x_y = (consumer.x, consumer.y)
-        hit_actor = None
+        if trace.hit_actor:
+            damage = dice_roller(self.num_dice, self.die_size, self.engine.rng.combat)
 
-        if path:
-            for tile_xy in path:
-                if not self.engine.game_map.tiles["walkable"][tile_xy[0], tile_xy[1]]:
-                    self.engine.message_log.add_message(
-                        f"The {self.parent.name} strikes a wall."
-                    )
-                    break
-                elif self.engine.game_map.get_actor_at_location(tile_xy[0], tile_xy[1]):
-                    x_y = tile_xy
-                    hit_actor = self.engine.game_map.get_actor_at_location(tile_xy[0], tile_xy[1])
-                    break
-                else:
-                    x_y = tile_xy
-            
-            self.consume()
-            if self.reusable:
-                self.parent.place(*x_y, self.engine.game_map)
-            
-            if hit_actor:
-                damage = dice_roller(self.num_dice, self.die_size)
+            self.engine.message_log.add_message(
+                f"The {self.parent.name} strikes the {trace.hit_actor.name}, dealing {damage} damage!"
+            )
+            trace.hit_actor.fighter.take_damage(damage)
 
-                self.engine.message_log.add_message(
-                    f"The {self.parent.name} strikes the {hit_actor.name}, dealing {damage} damage!"
-                )
-                hit_actor.fighter.take_damage(damage)
+        return animations.ProjectileAnimation(consumer, trace.path, color=self.projectile_color)
 
-            animation = animations.ProjectileAnimation(consumer, x_y[0], x_y[1], color=self.projectile_color)
-            return animation
 
-        else:
-            raise Impossible("Something went wrong with projectile pathfinding. Tell Luke if you see this!")
-            
-    
 class TeleportConsumable(Consumable):
     def __init__(self, maximum_range: int):
         self.maximum_range = maximum_range
@@ -296,8 +249,8 @@ class TeleportConsumable(Consumable):
             
             # keep generating tiles until you have one that hasn't been picked already
             while True:
-                potential_x = random.randint(consumer.x - self.maximum_range, consumer.x + self.maximum_range)
-                potential_y = random.randint(consumer.y - self.maximum_range, consumer.y + self.maximum_range)
+                potential_x = self.engine.rng.combat.randint(consumer.x - self.maximum_range, consumer.x + self.maximum_range)
+                potential_y = self.engine.rng.combat.randint(consumer.y - self.maximum_range, consumer.y + self.maximum_range)
 
                 potential_tile = (potential_x, potential_y)
 
@@ -315,11 +268,7 @@ class TeleportConsumable(Consumable):
                 continue
             
             # check for actors in potential tile
-            actor_occupying = False
-            for entity in self.engine.game_map.actors:
-                if entity.x == potential_x and entity.y == potential_y:
-                    actor_occupying = True
-            if actor_occupying:
+            if self.engine.game_map.get_actor_at_location(potential_x, potential_y):
                 continue
             
             valid_tile = potential_tile
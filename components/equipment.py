@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from typing import Optional, Tuple, TYPE_CHECKING
 
-from components.base_component import BaseComponent
+from components.base_component import BaseComponent, derived_stat
 from dice import dice_roller
 from equipment_types import EquipmentCategory, EquipmentType
 
@@ -44,7 +44,7 @@ class Equipment(BaseComponent):
         ]
         return slots
 
-    @property
+    @derived_stat
     def ac_bonus(self) -> int:
         bonus = 0
 
@@ -67,7 +67,7 @@ class Equipment(BaseComponent):
 
         return bonus + prof_bonus
     
-    @property
+    @derived_stat
     def damage(self) -> int:
         try: 
             bonus = self.parent.fighter.player_class.class_damage_bonus
@@ -75,7 +75,7 @@ class Equipment(BaseComponent):
             bonus = 0
         return self.weapon.equippable.num_dice, self.weapon.equippable.die_size, self.weapon.equippable.damage_bonus + bonus
     
-    @property
+    @derived_stat
     def weapon_prof_bonus(self) -> int:
         
         bonus = 0
@@ -96,7 +96,7 @@ class Equipment(BaseComponent):
         
         return prof_bonus + bonus
 
-    @property
+    @derived_stat
     def extra_attacks(self) -> int:
         bonus = 0
         for i in self.slots:  # Iterate through the list of slots and add each bonus
@@ -130,6 +130,7 @@ class Equipment(BaseComponent):
             self.unequip_from_slot(slot, add_message)
 
         setattr(self, slot, item)
+        self.parent.fighter.invalidate_derived_stats()
 
         if add_message:
             self.equip_message(item.name)
@@ -141,6 +142,7 @@ class Equipment(BaseComponent):
             self.unequip_message(current_item.name)
 
         setattr(self, slot, None)
+        self.parent.fighter.invalidate_derived_stats()
 
     def toggle_equip(self, equippable_item: Item, add_message: bool = True) -> None:
         if equippable_item.equippable:
@@ -1,14 +1,13 @@
 from __future__ import annotations
-from lib2to3.pytree import Base
 
 from typing import TYPE_CHECKING
 
 import color
-from components.base_component import BaseComponent
+from combat import AttackProfile
+from components.base_component import BaseComponent, derived_stat
 from components.prof import Proficiencies
 from equipment_types import EquipmentTraits
 from render_order import RenderOrder
-from dice import dice_roller
 
 from components.ancestries import BaseAncestry
 from components.classes import BaseClass
@@ -25,6 +24,19 @@ class BaseStats(BaseComponent):
     def __init__(self, hp: int = 5) -> None:
         self._hp = hp
         self.max_hp = hp
+
+    @derived_stat
+    def attack_profile(self) -> AttackProfile:
+        """This fighter's attacks compiled for the combat module."""
+        return self.compile_attack_profile()
+
+    def compile_attack_profile(self) -> AttackProfile:
+        raise NotImplementedError()
+
+    def invalidate_derived_stats(self) -> None:
+        """Call after anything the derived stats depend on changes: equipment, level, ability scores, ancestry or class."""
+        self.clear_derived_stats()
+        self.parent.equipment.clear_derived_stats()
     
     @property
     def hp(self) -> int:
@@ -32,6 +44,8 @@ class BaseStats(BaseComponent):
 
     @hp.setter
     def hp(self, value: int) -> None:
+        if value < self._hp and self.parent.ai:
+            self.gamemap.scheduler.wake(self.parent)  # Being hurt wakes up a parked actor.
         self._hp = max(0, min(value, self.max_hp))  # Clamp hp between 0 and the max_hp.
         if self.hp == 0 and self.parent.ai:
             self.die()
@@ -53,6 +67,7 @@ class BaseStats(BaseComponent):
         self.parent.ai = None
         self.parent.name = f"remains of {self.parent.name}"
         self.parent.render_order = RenderOrder.CORPSE
+        self.gamemap.update_entity_row(self.parent)
 
         self.engine.message_log.add_message(death_message, death_message_color)
 
@@ -121,7 +136,11 @@ class Player(BaseStats):
 
         self._hp = 5
 
-    @property
+    def invalidate_derived_stats(self) -> None:
+        super().invalidate_derived_stats()
+        self.player_class.clear_derived_stats()
+
+    @derived_stat
     def attacks_per_round(self) -> int:
         return self.player_class.attacks_per_round
 
@@ -154,18 +173,18 @@ class Player(BaseStats):
         return (self.cha-10)//2
 
     # TODO: prof bonuses
-    @property
+    @derived_stat
     def ac(self) -> int:
         return 10 + self.dex_mod + self.ac_bonus
 
-    @property
+    @derived_stat
     def ac_bonus(self) -> int:
         if self.parent.equipment:
             return self.parent.equipment.ac_bonus
         else:
             return self.proficiencies.prof_unarmored
 
-    @property
+    @derived_stat
     def damage(self) -> tuple[int, int, int, int, list[EquipmentTraits], tuple[int, int]]:
         if self.parent.equipment.weapon is not None:
             num_dice = self.parent.equipment.damage[0]
@@ -183,6 +202,11 @@ class Player(BaseStats):
             crit_bonus = None
         
         return to_hit, num_dice, die_size, dam_bonus, attack_traits, crit_bonus
+
+    def compile_attack_profile(self) -> AttackProfile:
+        # Finesse attacks use the better of strength and dexterity to hit.
+        finesse_bonus = max(self.dex_mod, self.str_mod) - self.str_mod
+        return AttackProfile([self.damage], self.attacks_per_round, finesse_bonus)
     
     @property
     def speed(self) -> int:
@@ -232,11 +256,12 @@ class Monster(BaseStats):
         self.attacks_per_round = attacks_per_round
         self.crit_bonus = crit_bonus
     
-    @property
-    def damage(self) -> tuple[int, int, int, int, list[EquipmentTraits], tuple[int, int]]:
-        choice = dice_roller(1, len(self.attacks))
-        to_hit, num_dice, die_size, dam_bonus, attack_traits = self.attacks[choice - 1]
-        if self.crit_bonus is not None:
-            return to_hit, num_dice, die_size, dam_bonus, attack_traits, self.crit_bonus[choice - 1]
-        else:
-            return to_hit, num_dice, die_size, dam_bonus, attack_traits, self.crit_bonus
+    def compile_attack_profile(self) -> AttackProfile:
+        # Finesse is already part of a monster's to-hit.
+        return AttackProfile(
+            [
+                (*attack, self.crit_bonus[i] if self.crit_bonus is not None else None)
+                for i, attack in enumerate(self.attacks)
+            ],
+            self.attacks_per_round,
+        )
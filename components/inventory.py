@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import List, Tuple, TYPE_CHECKING
+from typing import Dict, List, TYPE_CHECKING, Union
 
 from components.base_component import BaseComponent
 
@@ -11,30 +11,51 @@ if TYPE_CHECKING:
 class Inventory(BaseComponent):
     parent: Actor
 
+    cached_attributes = BaseComponent.cached_attributes + ("_stacks",)
+
     def __init__(self, capacity: int):
         self.capacity = capacity
         self.items: List[Item] = []
-    
+        # Stack key -> the items in that stack, in the order the stacks were started. Kept up to date by add and remove.
+        self._stacks: Dict[Union[str, Item], List[Item]] = {}
+
+    @staticmethod
+    def stack_key(item: Item) -> Union[str, Item]:
+        """Stackable items stack with others of the same name, everything else is a stack of its own."""
+        return item.name if item.stackable else item
+
     @property
     def items_stacked(self) -> List[List[Item]]:
         """Items in the inventory stacked into lists by item type, if the items are stackable."""
-        result_list: List[List[Item]] = []
- 
-        for item in self.items:
-            dupe = False
-            for list in result_list:
-                if item.name == list[0].name and item.stackable:
-                    list.append(item)
-                    dupe = True
-                    break
-            if not dupe:
-                result_list.append([item])
-        
-        return result_list
+        return list(self._stacks.values())
+
+    @property
+    def stack_count(self) -> int:
+        """The number of stacks, which is what counts against the capacity."""
+        return len(self._stacks)
+
+    def has_room_for(self, item: Item) -> bool:
+        """Return True if 'item' fits, either in a stack of its own or on an existing stack."""
+        return len(self._stacks) < self.capacity or self.stack_key(item) in self._stacks
+
+    def add(self, item: Item) -> None:
+        """Put 'item' in the inventory, on its stack."""
+        item.parent = self
+        self.items.append(item)
+        self._stacks.setdefault(self.stack_key(item), []).append(item)
+
+    def remove(self, item: Item) -> None:
+        """Take 'item' out of the inventory, dropping its stack once it is empty."""
+        self.items.remove(item)
+        key = self.stack_key(item)
+        stack = self._stacks[key]
+        stack.remove(item)
+        if not stack:
+            del self._stacks[key]
 
     def drop(self, item: Item) -> None:
         """Removes an item from the inventory and restores it to the game map, at the player's current location."""
-        self.items.remove(item)
+        self.remove(item)
         item.place(self.parent.x, self.parent.y, self.gamemap)
 
-        self.engine.message_log.add_message(f"You drop the {item.name}.")
\ No newline at end of file
+        self.engine.message_log.add_message(f"You drop the {item.name}.")
@@ -46,8 +46,10 @@ class Level(BaseComponent):
                 f"You advance to level {self.current_level + 1}!"
             )
             self.engine.player.fighter.player_class.on_level_up(self.current_level + 1)
+            self.engine.player.fighter.invalidate_derived_stats()
 
     def increase_level(self) -> None:
         self.current_xp -= self.experience_to_next_level
 
         self.current_level += 1
+        self.parent.fighter.invalidate_derived_stats()
@@ -1,10 +1,92 @@
 from __future__ import annotations
 
-from random import randint
+from random import Random
+from typing import Tuple
 
-def dice_roller(num_dice: int, dice_size: int) -> int:
-    """Rolls a number of dice of a specified size and returns the total result."""
+import numpy as np  # type: ignore
+
+def dice_roller(num_dice: int, dice_size: int, rng: Random) -> int:
+    """Rolls a number of dice of a specified size with 'rng' and returns the total result."""
     total = 0
     for i in range(num_dice):
-        total += randint(1, dice_size)
-    return total
\ No newline at end of file
+        total += rng.randint(1, dice_size)
+    return total
+
+
+def roll_dice(num_dice: np.ndarray, die_size: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """Roll a batch of dice pools with one call to 'rng' and return the total of each.
+
+    'num_dice' and 'die_size' are broadcast together, pool i is num_dice[i] dice of size die_size[i].
+    Pools of zero dice (or zero sided dice) total 0.
+    """
+    num_dice, die_size = np.broadcast_arrays(np.asarray(num_dice), np.asarray(die_size))
+    if num_dice.size == 0:
+        return np.zeros(num_dice.shape, dtype=np.int64)
+
+    columns = max(int(num_dice.max()), 1)
+    sides = np.maximum(die_size, 1)[..., np.newaxis]
+    rolls = rng.integers(1, sides, size=num_dice.shape + (columns,), endpoint=True)
+    rolls[np.arange(columns) >= num_dice[..., np.newaxis]] = 0
+    rolls[die_size < 1] = 0
+    return rolls.sum(axis=-1)
+
+
+def roll_damage(
+    num_dice: np.ndarray,
+    die_size: np.ndarray,
+    bonus: np.ndarray,
+    critical: np.ndarray,
+    rng: np.random.Generator,
+    fatal_size: np.ndarray = 0,
+    deadly_dice: np.ndarray = 0,
+    deadly_size: np.ndarray = 0,
+) -> np.ndarray:
+    """Roll a batch of NdS+B damage expressions, all in one call to 'rng'.
+
+    Where 'critical' is set the bonus is doubled. A non-zero 'fatal_size' then also turns the dice into one more
+    die of that size, and 'deadly_dice' dice of 'deadly_size' are added on top.
+    """
+    num_dice, die_size, bonus, critical, fatal_size, deadly_dice, deadly_size = np.broadcast_arrays(
+        *(np.asarray(a) for a in (num_dice, die_size, bonus, critical, fatal_size, deadly_dice, deadly_size))
+    )
+    fatal = critical & (fatal_size > 0)
+
+    # The weapon dice and the deadly dice are rolled as two halves of one batch.
+    pools = roll_dice(
+        np.stack((num_dice + fatal, np.where(critical, deadly_dice, 0))),
+        np.stack((np.where(fatal, fatal_size, die_size), deadly_size)),
+        rng,
+    )
+    return pools[0] + pools[1] + np.where(critical, bonus * 2, bonus)
+
+
+def distribution(num_dice: int, die_size: int, bonus: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """Return the exact outcomes of NdS+B and their probabilities, as two arrays."""
+    probabilities = np.ones(1)
+    if num_dice > 0 and die_size > 0:
+        die = np.full(die_size, 1 / die_size)
+        for _ in range(num_dice):
+            probabilities = np.convolve(probabilities, die)
+    lowest = min(num_dice, num_dice * die_size) + bonus
+    return np.arange(lowest, lowest + len(probabilities)), probabilities
+
+
+def damage_distribution(
+    num_dice: int,
+    die_size: int,
+    bonus: int,
+    critical: bool = False,
+    fatal_size: int = 0,
+    deadly_dice: int = 0,
+    deadly_size: int = 0,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Return the exact outcomes and probabilities of one roll_damage expression."""
+    if not critical:
+        return distribution(num_dice, die_size, bonus)
+    if fatal_size:
+        num_dice, die_size = num_dice + 1, fatal_size
+    values, probabilities = distribution(num_dice, die_size, bonus * 2)
+    deadly_values, deadly_probabilities = distribution(deadly_dice, deadly_size)
+    probabilities = np.convolve(probabilities, deadly_probabilities)
+    lowest = values[0] + deadly_values[0]
+    return np.arange(lowest, lowest + len(probabilities)), probabilities
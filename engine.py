@@ -1,15 +1,17 @@
 from __future__ import annotations
 
-import lzma
-import pickle
 from typing import TYPE_CHECKING, Optional, Tuple
 
 from tcod.console import Console
 from tcod.map import compute_fov
 
+from animations import Animator
+from components.ai import FlowField
 import exceptions
 from message_log import MessageLog
+from rng import RNG
 import render_functions
+from scheduler import action_delay
 
 if TYPE_CHECKING:
     from entity import Actor
@@ -18,16 +20,27 @@ if TYPE_CHECKING:
     from viewport import Viewport
 
 
+FOV_RADIUS = 8
+
+# Actors with nothing to do further than this from the player (in both directions) are parked until it comes closer.
+# Hostile monsters only start chasing once they are in view, so anything at least FOV_RADIUS is safe.
+WAKE_RADIUS = FOV_RADIUS + 2
+
+
 class Engine:
     game_map: GameMap
     game_world: GameWorld
     viewport: Viewport
 
-    def __init__(self, player: Actor):
+    def __init__(self, player: Actor, seed: Optional[int] = None):
+        self.rng = RNG(seed)
         self.message_log = MessageLog()
         self.mouse_location = (0, 0)
         self.player = player
         self.magnification = 2
+        self.wake_radius = WAKE_RADIUS
+        self.animator = Animator()  # Not saved, animations in progress are simply dropped.
+        self._flow_field: Optional[FlowField] = None
 
     def set_magnification(self, zoom: str) -> None:
         if zoom == "in" and self.magnification < 2:
@@ -35,47 +48,78 @@ class Engine:
         elif zoom == "out" and self.magnification > 0.25:
             self.magnification /= 2
 
+    @property
+    def flow_field(self) -> FlowField:
+        """Distances to the player, computed at most once per enemy turn."""
+        if self._flow_field is None:
+            self._flow_field = FlowField(self.game_map, self.player.x, self.player.y)
+        return self._flow_field
+
     def handle_enemy_turns(self) -> list[BaseAnimation]:
+        """Let every other actor on the floor act until the player's next action is due.
+
+        How long that is, and how often each actor acts meanwhile, follows from their speeds, see scheduler.py.
+        Actors far from the player with nothing to do are parked, so they cost nothing until the player comes within
+        'wake_radius' of them or they take damage.
+        """
         animations = []
-        for entity in set(self.game_map.actors) - {self.player}:
-            if entity.ai:
-                try:
-                    # give each ai a number of moves according to its speed
-                    if entity.speed >= 0:
-                        for i in range(0, entity.speed + 1):
-                            # get any animations caused by ai actions
-                            new_animation = entity.ai.perform()
-                            if new_animation is not None:
-                                if len(new_animation) > 0:
-                                    for i in new_animation:
-                                        animations.append(i)
-                    
-                    # if ai is slow then potentially skip its turn
-                    elif entity.speed < 0:
-                        if entity.turn_skip < 0:
-                            pass
-                        elif entity.turn_skip >= 0:
-                            new_animation = entity.ai.perform()
-                            if new_animation is not None:
-                                if len(new_animation) > 0:
-                                    for i in new_animation:
-                                        animations.append(i)
-                            entity.reset_turn_skip()
-
-                except exceptions.Impossible:
-                    pass  # Ignore impossible action exceptions from AI.
-        
+        self._flow_field = None
+        game_map = self.game_map
+        scheduler = game_map.scheduler
+        player_x, player_y = self.player.x, self.player.y
+        game_map.wake_actors_near(player_x, player_y, self.wake_radius)
+
+        for entity in scheduler.due(scheduler.time + action_delay(self.player.speed)):
+            if not entity.ai or entity.parent is not game_map:
+                scheduler.remove(entity)  # Died or left the floor since it was scheduled.
+                continue
+            if (
+                entity.ai.can_sleep
+                and max(abs(entity.x - player_x), abs(entity.y - player_y)) > self.wake_radius
+            ):
+                scheduler.park(entity)
+                continue
+            try:
+                # get any animations caused by ai actions
+                new_animation = entity.ai.perform()
+                if new_animation:
+                    animations.extend(new_animation)
+            except exceptions.Impossible:
+                pass  # Ignore impossible action exceptions from AI.
+
+        self._flow_field = None  # Stale once the player moves again.
         return animations
 
     def update_fov(self) -> None:
-        """Recompute the visible area based on the player's point of view."""
-        self.game_map.visible[:] = compute_fov(
-            self.game_map.tiles["transparent"],
-            (self.player.x, self.player.y),
-            radius=8,
+        """Recompute the visible area based on the player's point of view.
+
+        Only the square the FOV radius can reach is recomputed, and nothing is done if the player has not moved
+        since the last call. Tiles never change once a floor is generated, so the position is all that matters.
+        """
+        game_map = self.game_map
+        x, y = self.player.x, self.player.y
+
+        fov_key = (x, y)
+        if fov_key == game_map.fov_key:
+            return
+        game_map.fov_key = fov_key
+
+        window = (
+            slice(max(0, x - FOV_RADIUS), x + FOV_RADIUS + 1),
+            slice(max(0, y - FOV_RADIUS), y + FOV_RADIUS + 1),
+        )
+
+        # Clear what was lit last time, then light the new window.
+        game_map.visible[game_map.fov_window] = False
+        game_map.visible[window] = compute_fov(
+            game_map.tiles["transparent"][window],
+            (x - window[0].start, y - window[1].start),
+            radius=FOV_RADIUS,
         )
+        game_map.fov_window = window
+
         # If a tile is "visible" it should be added to "explored".
-        self.game_map.explored |= self.game_map.visible
+        game_map.explored[window] |= game_map.visible[window]
 
     def render(self, b_console: Console, i_console: Console, m_console: Console, ui_console: Console, render_center: Optional[Tuple[int, int]] = None) -> None:
         
@@ -105,8 +149,8 @@ class Engine:
             console=ui_console, x=21, y=ui_console.height-6, engine=self
         )
 
-    def save_as(self, filename: str) -> None:
-        """Save this Engine instance as a compressed file."""
-        save_data = lzma.compress(pickle.dumps(self))
-        with open(filename, "wb") as f:
-            f.write(save_data)
+    def save_as(self, filename: str, compressor: Optional[str] = None) -> None:
+        """Save this Engine instance as a save file, see savefile.py for the format."""
+        import savefile
+
+        savefile.save(self, filename, compressor)
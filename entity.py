@@ -1,9 +1,7 @@
 from __future__ import annotations
 
-import copy
-from inspect import stack
 import math
-from typing import Optional, Tuple, Type, TypeVar, TYPE_CHECKING, Union
+from typing import Callable, Dict, Optional, Tuple, Type, TYPE_CHECKING, Union
 from components.fighter import BaseStats
 
 from render_order import RenderOrder
@@ -18,7 +16,8 @@ if TYPE_CHECKING:
     from components.level import Level
     from game_map import GameMap
 
-T = TypeVar("T", bound="Entity")
+# Every prototype by its key, so saved entities can be rebuilt from the prototype they came from.
+prototypes: Dict[str, Union[ActorPrototype, ItemPrototype]] = {}
 
 
 class Entity:
@@ -46,34 +45,29 @@ class Entity:
         self.name = name
         self.blocks_movement = blocks_movement
         self.render_order = render_order
+        self.prototype_key: Optional[str] = None  # Key of the prototype this entity was built from, if any.
         if parent:
             # If parent isn't provided now then it will be set later.
             self.parent = parent
-            parent.entities.add(self)  # not sure might be gamemap instead of parent
+            parent.add_entity(self)
 
     @property
     def gamemap(self) -> GameMap:
         return self.parent.gamemap
 
-    def spawn(self: T, gamemap: GameMap, x: int, y: int) -> T:
-        """Spawn a copy of this instance at the given location."""
-        clone = copy.deepcopy(self)
-        clone.x = x
-        clone.y = y
-        clone.parent = gamemap
-        gamemap.entities.add(clone)
-        return clone
-
     def place(self, x: int, y: int, gamemap: Optional[GameMap] = None) -> None:
         """Place this entity at a new location. Handles moving across GameMaps."""
+        on_map = hasattr(self, "parent") and self.parent is self.gamemap  # Parent is possibly uninitialized
+        old_x, old_y = self.x, self.y
+        if gamemap and on_map:
+            self.gamemap.remove_entity(self)
         self.x = x
         self.y = y
         if gamemap:
-            if hasattr(self, "parent"):  # Possibly uninitialized
-                if self.parent is self.gamemap:
-                    self.gamemap.entities.remove(self)
             self.parent = gamemap
-            gamemap.entities.add(self)
+            gamemap.add_entity(self)
+        elif on_map:
+            self.gamemap.relocate_entity(self, old_x, old_y)
 
     def distance(self, x: int, y: int) -> float:
         """
@@ -83,8 +77,10 @@ class Entity:
 
     def move(self, dx: int, dy: int):
         # Move the entity by a given amount
+        old_x, old_y = self.x, self.y
         self.x += dx
         self.y += dy
+        self.gamemap.relocate_entity(self, old_x, old_y)
     
     def rename(self, new_name: str) -> None:
         self.name = new_name
@@ -132,8 +128,6 @@ class Actor (Entity):
 
         self.effects = effects
 
-        self.turn_skip = 0
-
     @property
     def speed(self) -> int:
         """Return the speed from the fighter plus any modifiers - if none is found use default speed (0)"""
@@ -147,9 +141,6 @@ class Actor (Entity):
     def is_alive(self) -> bool:
         """Returns True as long as this actor can perform actions."""
         return bool(self.ai)
-    
-    def reset_turn_skip(self) -> None:
-        self.turn_skip = self.speed
 
 
 class Item(Entity):
@@ -186,3 +177,105 @@ class Item(Entity):
         self.equippable = equippable
         if self.equippable:
             self.equippable.parent = self
+
+
+class ActorPrototype:
+    """
+    A compact recipe for building fresh Actors, used instead of deep-copying a template Actor.
+
+    The component arguments are zero-argument callables (usually a class or a functools.partial) that are called
+    once per built actor, so no mutable state is shared, while immutable data such as attack tables is.
+    """
+
+    def __init__(
+        self,
+        *,
+        key: str,
+        char: str = "?",
+        color: Tuple[int, int, int] = (255, 255, 255),
+        name: str = "<Unnamed>",
+        ai_cls: Type[BaseAI],
+        equipment: Callable[[], Equipment],
+        fighter: Callable[[], BaseStats],
+        inventory: Callable[[], Inventory],
+        level: Callable[[], Level],
+    ):
+        self.key = key
+        prototypes[key] = self
+
+        self.char = char
+        self.color = color
+        self.name = name
+        self.ai_cls = ai_cls
+        self.equipment = equipment
+        self.fighter = fighter
+        self.inventory = inventory
+        self.level = level
+
+    def build(self) -> Actor:
+        """Return a new Actor with freshly built components."""
+        actor = Actor(
+            char=self.char,
+            color=self.color,
+            name=self.name,
+            ai_cls=self.ai_cls,
+            equipment=self.equipment(),
+            fighter=self.fighter(),
+            inventory=self.inventory(),
+            level=self.level(),
+        )
+        actor.prototype_key = self.key
+        return actor
+
+    def spawn(self, gamemap: GameMap, x: int, y: int) -> Actor:
+        """Build a new Actor at the given location."""
+        actor = self.build()
+        actor.place(x, y, gamemap)
+        return actor
+
+
+class ItemPrototype:
+    """A compact recipe for building fresh Items. See ActorPrototype."""
+
+    def __init__(
+        self,
+        *,
+        key: str,
+        char: str = "?",
+        color: Tuple[int, int, int] = (255, 255, 255),
+        name: str = "<Unnamed>",
+        consumable: Optional[Callable[[], Consumable]] = None,
+        equippable: Optional[Callable[[], Equippable]] = None,
+        desc_string: Optional[str] = None,
+        stackable: Optional[bool] = False,
+    ):
+        self.key = key
+        prototypes[key] = self
+
+        self.char = char
+        self.color = color
+        self.name = name
+        self.consumable = consumable
+        self.equippable = equippable
+        self.desc_string = desc_string
+        self.stackable = stackable
+
+    def build(self) -> Item:
+        """Return a new Item with freshly built components."""
+        item = Item(
+            char=self.char,
+            color=self.color,
+            name=self.name,
+            consumable=self.consumable() if self.consumable else None,
+            equippable=self.equippable() if self.equippable else None,
+            desc_string=self.desc_string,
+            stackable=self.stackable,
+        )
+        item.prototype_key = self.key
+        return item
+
+    def spawn(self, gamemap: GameMap, x: int, y: int) -> Item:
+        """Build a new Item at the given location."""
+        item = self.build()
+        item.place(x, y, gamemap)
+        return item
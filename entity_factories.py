@@ -1,37 +1,52 @@
+from functools import partial
+
 from components.ai import HostileEnemy
 from components import consumable, equippable
+from components.ancestries import BaseAncestry
 from components.equipment import Equipment
 from components.equippable import Equippable
+from components.prof import Proficiencies
 from equipment_types import EquipmentCategory, EquipmentTraits, EquipmentType
 from components.fighter import Monster, Player
 from components.inventory import Inventory
 from components.level import Level
-from entity import Actor, Item
+from entity import ActorPrototype, ItemPrototype
 import color
 import components.classes
 
+
+def player_fighter() -> Player:
+    """Build the player's stats, giving each player its own ancestry, class and proficiencies."""
+    return Player(
+        ancestry=BaseAncestry(),
+        player_class=components.classes.Fighter(),
+        proficiencies=Proficiencies(),
+    )
+
+
 # PLAYER
-player = Actor(
+player = ActorPrototype(
+    key="player",
     char="@",
     color=color.white,
     name="Player",
     ai_cls=HostileEnemy,
-    equipment=Equipment(),
-    fighter=Player(
-        player_class=components.classes.Fighter(),
-    ),
-    inventory=Inventory(capacity=26),
-    level=Level(level_up_base=250),
+    equipment=Equipment,
+    fighter=player_fighter,
+    inventory=partial(Inventory, capacity=26),
+    level=partial(Level, level_up_base=250),
 )
 
 # ENEMIES
-goblin = Actor(
+goblin = ActorPrototype(
+    key="goblin",
     char="g",
     color=color.white,   #(63, 127, 63),
     name="Goblin",
     ai_cls=HostileEnemy,
-    equipment=Equipment(),
-    fighter=Monster(
+    equipment=Equipment,
+    fighter=partial(
+        Monster,
         str_mod=0,
         dex_mod=3,
         con_mod=1,
@@ -44,19 +59,21 @@ goblin = Actor(
         fort=5,
         refl=7,
         will=3,
-        attacks=[[8, 1, 6, 0, [EquipmentTraits.AGILE, EquipmentTraits.FINESSE]]],
+        attacks=((8, 1, 6, 0, (EquipmentTraits.AGILE, EquipmentTraits.FINESSE)),),
         attacks_per_round=2,
     ),
-    inventory=Inventory(capacity=0),
-    level=Level(current_level=-1),
+    inventory=partial(Inventory, capacity=0),
+    level=partial(Level, current_level=-1),
 )
-orc = Actor(
+orc = ActorPrototype(
+    key="orc",
     char="o",
     color=color.white, #(63, 127, 63),
     name="Orc",
     ai_cls=HostileEnemy,
-    equipment=Equipment(),
-    fighter=Monster(
+    equipment=Equipment,
+    fighter=partial(
+        Monster,
         str_mod=3,
         dex_mod=2,
         con_mod=3,
@@ -69,19 +86,21 @@ orc = Actor(
         fort=6,
         refl=4,
         will=2,
-        attacks=[[7, 1, 6, 3, [EquipmentTraits.AGILE, EquipmentTraits.DISARM]], [7, 1, 4, 3, [EquipmentTraits.AGILE]]],
+        attacks=((7, 1, 6, 3, (EquipmentTraits.AGILE, EquipmentTraits.DISARM)), (7, 1, 4, 3, (EquipmentTraits.AGILE,))),
         attacks_per_round=2,
     ),
-    inventory=Inventory(capacity=0),
-    level=Level(current_level=0),
+    inventory=partial(Inventory, capacity=0),
+    level=partial(Level, current_level=0),
 )
-troll = Actor(
+troll = ActorPrototype(
+    key="troll",
     char="T",
     color=color.white, #(0, 127, 0),
     name="Troll",
     ai_cls=HostileEnemy,
-    equipment=Equipment(),
-    fighter=Monster(
+    equipment=Equipment,
+    fighter=partial(
+        Monster,
         str_mod=5,
         dex_mod=2,
         con_mod=6,
@@ -94,19 +113,21 @@ troll = Actor(
         fort=12,
         refl=6,
         will=2,
-        attacks=[[8, 2, 10, 5, [EquipmentTraits.REACH]], [8, 2, 8, 5, [EquipmentTraits.AGILE, EquipmentTraits.REACH]]],
+        attacks=((8, 2, 10, 5, (EquipmentTraits.REACH,)), (8, 2, 8, 5, (EquipmentTraits.AGILE, EquipmentTraits.REACH))),
         attacks_per_round=2,
     ),
-    inventory=Inventory(capacity=0),
-    level=Level(current_level=5),
+    inventory=partial(Inventory, capacity=0),
+    level=partial(Level, current_level=5),
 )
-ogre = Actor(
+ogre = ActorPrototype(
+    key="ogre",
     char="O",
     color=color.white, #(0, 82, 0),
     name="Ogre",
     ai_cls=HostileEnemy,
-    equipment=Equipment(),
-    fighter=Monster(
+    equipment=Equipment,
+    fighter=partial(
+        Monster,
         str_mod=5,
         dex_mod=-1,
         con_mod=4,
@@ -119,152 +140,172 @@ ogre = Actor(
         fort=8,
         refl=3,
         will=2,
-        attacks=[[9, 1, 10, 7, [EquipmentTraits.DEADLY, EquipmentTraits.REACH, EquipmentTraits.TRIP]]],
-        crit_bonus=[[1, 10]]
+        attacks=((9, 1, 10, 7, (EquipmentTraits.DEADLY, EquipmentTraits.REACH, EquipmentTraits.TRIP)),),
+        crit_bonus=((1, 10),)
     ),
-    inventory=Inventory(capacity=0),
-    level=Level(current_level=3),
+    inventory=partial(Inventory, capacity=0),
+    level=partial(Level, current_level=3),
 )
 
 # CONSUMABLES
-confusion_scroll = Item(
+confusion_scroll = ItemPrototype(
+    key="confusion_scroll",
     char=chr(0xE00B),
     color=color.purple,
     name="Confusion Scroll",
-    consumable=consumable.ConfusionConsumable(number_of_turns=5, animation=True, color=color.purple),
+    consumable=partial(consumable.ConfusionConsumable, number_of_turns=5, animation=True, color=color.purple),
     desc_string="Confuses an enemy for 5 turns",
     stackable=True,
 )
-fireball_scroll = Item(
+fireball_scroll = ItemPrototype(
+    key="fireball_scroll",
     char=chr(0xE00D),
     color=color.red,
     name="Fireball Scroll",
-    consumable=consumable.RadiusDamageConsumable(num_dice=6, die_size=6, radius=3),
+    consumable=partial(consumable.RadiusDamageConsumable, num_dice=6, die_size=6, radius=3),
     desc_string="Deals 6d6 damage in a radius",
     stackable=True,
 )
-health_kit = Item(
+health_kit = ItemPrototype(
+    key="health_kit",
     char="+",
     color=color.purple,
     name="Health Kit",
-    consumable=consumable.HealingConsumable(amount=20),
+    consumable=partial(consumable.HealingConsumable, amount=20),
     desc_string="Heals for 20 HP",
     stackable=True,
 )
-lightning_scroll = Item(
+lightning_scroll = ItemPrototype(
+    key="lightning_scroll",
     char=chr(0xE00C),
     color=color.yellow,
     name="Lightning Scroll",
-    consumable=consumable.SingleTargetDamageConsumable(num_dice=4, die_size=12, maximum_range=5, animation=True, color=color.light_blue),
+    consumable=partial(consumable.SingleTargetDamageConsumable, num_dice=4, die_size=12, maximum_range=5, animation=True, color=color.light_blue),
     desc_string="Deals 4d12 damage to nearby enemy",
     stackable=True,
 )
-teleport_scroll = Item(
+teleport_scroll = ItemPrototype(
+    key="teleport_scroll",
     char=chr(0xE00A),
     color=color.grey,
     name="Teleportation Scroll",
-    consumable=consumable.TeleportConsumable(maximum_range=50),
+    consumable=partial(consumable.TeleportConsumable, maximum_range=50),
     desc_string="Teleports you randomly",
     stackable=True,
 )
-throwing_star = Item(
+throwing_star = ItemPrototype(
+    key="throwing_star",
     char="x",
     color=color.grey,
     name="Throwing Star",
-    consumable=consumable.ProjectileConsumable(1, 6, True, color.grey),
+    consumable=partial(consumable.ProjectileConsumable, 1, 6, True, color.grey),
     desc_string="Can be thrown at an enemy",
     stackable=True,
 )
 
 
 # WEAPONS
-dagger = Item(
+dagger = ItemPrototype(
+    key="dagger",
     char="/",
     color=color.grey,
     name="Dagger",
-    equippable=Equippable(
+    equippable=partial(
+        Equippable,
         equipment_type=EquipmentType.WEAPON,
         equipment_category=EquipmentCategory.SIMPLE,
-        equipment_traits=[EquipmentTraits.AGILE, EquipmentTraits.FINESSE, EquipmentTraits.THROWN, EquipmentTraits.VERSATILE_P],
+        equipment_traits=(EquipmentTraits.AGILE, EquipmentTraits.FINESSE, EquipmentTraits.THROWN, EquipmentTraits.VERSATILE_P),
         num_dice=1,
         die_size=4,
         base_name="Dagger",
     )
 )
-shortsword = Item(
+shortsword = ItemPrototype(
+    key="shortsword",
     char="/",
     color=color.grey,
     name="Shortsword",
-    equippable=Equippable(
+    equippable=partial(
+        Equippable,
         equipment_type=EquipmentType.WEAPON,
         equipment_category=EquipmentCategory.MARTIAL,
-        equipment_traits=[EquipmentTraits.AGILE, EquipmentTraits.FINESSE, EquipmentTraits.VERSATILE_S],
+        equipment_traits=(EquipmentTraits.AGILE, EquipmentTraits.FINESSE, EquipmentTraits.VERSATILE_S),
         num_dice=1,
         die_size=6,
         base_name="Shortsword",
     )
 )
-longsword = Item(
+longsword = ItemPrototype(
+    key="longsword",
     char="/",
     color=color.grey,
     name="Longsword",
-    equippable=Equippable(
+    equippable=partial(
+        Equippable,
         equipment_type=EquipmentType.WEAPON,
         equipment_category=EquipmentCategory.MARTIAL,
-        equipment_traits=[EquipmentTraits.VERSATILE_P],
+        equipment_traits=(EquipmentTraits.VERSATILE_P,),
         num_dice=1,
         die_size=8,
         base_name="Longsword",
     )
 )
-rapier = Item(
+rapier = ItemPrototype(
+    key="rapier",
     char="/",
     color=color.grey,
     name="Rapier",
-    equippable=Equippable(
+    equippable=partial(
+        Equippable,
         equipment_type=EquipmentType.WEAPON,
         equipment_category=EquipmentCategory.MARTIAL,
-        equipment_traits=[EquipmentTraits.DEADLY, EquipmentTraits.DISARM, EquipmentTraits.FINESSE],
+        equipment_traits=(EquipmentTraits.DEADLY, EquipmentTraits.DISARM, EquipmentTraits.FINESSE),
         num_dice=1,
         die_size=6,
-        crit_bonus=[1, 8],
+        crit_bonus=(1, 8),
         base_name="Rapier",
     )
 )
-axe = Item(
+axe = ItemPrototype(
+    key="axe",
     char="/",
     color=color.grey,
     name="Battle axe",
-    equippable=Equippable(
+    equippable=partial(
+        Equippable,
         equipment_type=EquipmentType.WEAPON,
         equipment_category=EquipmentCategory.MARTIAL,
-        equipment_traits=[EquipmentTraits.SWEEP],
+        equipment_traits=(EquipmentTraits.SWEEP,),
         num_dice=1,
         die_size=8,
         base_name="Battle axe",
     )
 )
-club = Item(
+club = ItemPrototype(
+    key="club",
     char="/",
     color=color.brown,
     name="Club",
-    equippable=Equippable(
+    equippable=partial(
+        Equippable,
         equipment_type=EquipmentType.WEAPON,
         equipment_category=EquipmentCategory.SIMPLE,
-        equipment_traits=[EquipmentTraits.THROWN],
+        equipment_traits=(EquipmentTraits.THROWN,),
         num_dice=1,
         die_size=6,
         base_name="Club",
     )
 )
-light_hammer = Item(
+light_hammer = ItemPrototype(
+    key="light_hammer",
     char="/",
     color=color.grey,
     name="Light hammer",
-    equippable=Equippable(
+    equippable=partial(
+        Equippable,
         equipment_type=EquipmentType.WEAPON,
         equipment_category=EquipmentCategory.MARTIAL,
-        equipment_traits=[EquipmentTraits.AGILE, EquipmentTraits.THROWN],
+        equipment_traits=(EquipmentTraits.AGILE, EquipmentTraits.THROWN),
         num_dice=1,
         die_size=6,
         base_name="Light hammer",
@@ -272,21 +313,25 @@ light_hammer = Item(
 )
 
 # SHIELDS
-wood_shield = Item(
+wood_shield = ItemPrototype(
+    key="wood_shield",
     char=")",
     color=color.brown,
     name="Wooden Shield",
-    equippable=Equippable(
+    equippable=partial(
+        Equippable,
         equipment_type=EquipmentType.SHIELD,
         ac_bonus=1,
         base_name="Wooden Shield",
     )
 )
-iron_shield = Item(
+iron_shield = ItemPrototype(
+    key="iron_shield",
     char=")",
     color=color.grey,
     name="Iron Shield",
-    equippable=Equippable(
+    equippable=partial(
+        Equippable,
         equipment_type=EquipmentType.SHIELD,
         ac_bonus=2,
         base_name="Iron Shield",
@@ -294,22 +339,26 @@ iron_shield = Item(
 )
 
 # CHEST ARMOR
-leather_armor = Item(
+leather_armor = ItemPrototype(
+    key="leather_armor",
     char="[",
     color=color.brown,
     name="Leather Armor",
-    equippable=Equippable(
+    equippable=partial(
+        Equippable,
         equipment_type=EquipmentType.CHEST,
         equipment_category=EquipmentCategory.LIGHT,
         ac_bonus=1,
         base_name="Leather Armor",
     )
 )
-chain_mail = Item(
+chain_mail = ItemPrototype(
+    key="chain_mail",
     char="[",
     color=color.grey,
     name="Chain Mail",
-    equippable=Equippable(
+    equippable=partial(
+        Equippable,
         equipment_type=EquipmentType.CHEST,
         equipment_category=EquipmentCategory.MEDIUM,
         ac_bonus=4,
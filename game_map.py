@@ -1,17 +1,52 @@
 from __future__ import annotations
 
-from typing import Iterable, Iterator, Optional, TYPE_CHECKING
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, TYPE_CHECKING
 
 import numpy as np # type: ignore
+import tcod.los
 from tcod.console import Console
 
 from entity import Actor, Item
+from render_order import RenderOrder
+from scheduler import TurnScheduler
 import tile_types
 
 if TYPE_CHECKING:
     from engine import Engine
     from entity import Entity
 
+# One row per entity on a GameMap, so entities can be drawn and queried with array operations.
+entity_dt = np.dtype(
+    [
+        ("x", np.int32),
+        ("y", np.int32),
+        ("ch", np.int32),  # Unicode codepoint of the entity's glyph.
+        ("render_order", np.int8),  # RenderOrder value, or 0 for an unused row.
+    ]
+)
+
+
+class Trace:
+    """Where a projectile flew from its origin toward a target, and what stopped it. See GameMap.trace."""
+
+    def __init__(
+        self,
+        origin: Tuple[int, int],
+        path: List[Tuple[int, int]],
+        hit_actor: Optional[Actor] = None,
+        hit_wall: bool = False,
+    ):
+        self.origin = origin
+        self.path = path  # Tiles the projectile passed through after the origin, ending where it stopped.
+        self.hit_actor = hit_actor
+        self.hit_wall = hit_wall  # True if a wall stopped it just past the end of 'path'.
+
+    @property
+    def end(self) -> Tuple[int, int]:
+        """The tile the projectile stopped on."""
+        return self.path[-1] if self.path else self.origin
+
 
 class GameMap:
     def __init__(
@@ -19,7 +54,24 @@ class GameMap:
     ):
         self.engine = engine
         self.width, self.height = width, height
-        self.entities = set(entities)
+        # Used as an ordered set, so entities are always visited in the same order for the same seed.
+        self.entities: Dict[Entity, None] = {}
+
+        # Entities bucketed by the tile they stand on, kept up to date by Entity.move/place/spawn.
+        self.entity_index: Dict[Tuple[int, int], List[Entity]] = {}
+
+        # The same entities as rows of a structured array, with unused rows kept on a free list.
+        self.entity_data = np.zeros(64, dtype=entity_dt)
+        self.entity_rows: Dict[Entity, int] = {}
+        self.row_entities = np.full(len(self.entity_data), None, dtype=object)  # The entity in each row.
+        self._free_rows = list(range(len(self.entity_data) - 1, -1, -1))
+
+        # When each actor other than the player acts next, see Engine.handle_enemy_turns.
+        self.scheduler = TurnScheduler()
+
+        for entity in entities:
+            self.add_entity(entity)
+
         self.tiles = np.full((width, height), fill_value=tile_types.wall, order="F")
 
         self.visible = np.full(
@@ -30,7 +82,11 @@ class GameMap:
             (width, height), fill_value=False, order="F"
         )  # Tiles the player has seen before
 
+        self.fov_key: Optional[Tuple[int, int]] = None  # (player x, player y) of the last FOV update
+        self.fov_window: Tuple[slice, slice] = (slice(0, 0), slice(0, 0))  # Area lit by the last FOV update
+
         self.downstairs_location = (0, 0)
+        self.upstairs_location = (0, 0)  # Where the player arrives from the floor above.
 
     @property
     def gamemap(self) -> GameMap:
@@ -54,30 +110,208 @@ class GameMap:
             if isinstance(entity, Item)
         )
 
+    def add_entity(self, entity: Entity) -> None:
+        """Add an entity to this map and index it at its current location."""
+        self.entities[entity] = None
+        self.entity_index.setdefault((entity.x, entity.y), []).append(entity)
+
+        if not self._free_rows:
+            # Double the table, handing out the new rows lowest first.
+            size = len(self.entity_data)
+            self.entity_data = np.concatenate((self.entity_data, np.zeros(size, dtype=entity_dt)))
+            self.row_entities = np.concatenate((self.row_entities, np.full(size, None, dtype=object)))
+            self._free_rows = list(range(2 * size - 1, size - 1, -1))
+        row = self.entity_rows[entity] = self._free_rows.pop()
+        self.row_entities[row] = entity
+        self.update_entity_row(entity)
+
+        if isinstance(entity, Actor) and entity.is_alive and entity is not self.engine.player:
+            self.scheduler.add(entity, self.scheduler.time)
+
+    def restore_entity_rows(self, entities: Sequence[Entity], rows: Sequence[int], free_rows: Sequence[int]) -> None:
+        """Move 'entities', already on this map, to the given rows of a table sized to fit them and 'free_rows'.
+
+        Queries on the table return actors in row order, so a loaded map has to keep the rows it was saved with to
+        play out the same way.
+        """
+        size = len(rows) + len(free_rows)
+        self.entity_data = np.zeros(size, dtype=entity_dt)
+        self.row_entities = np.full(size, None, dtype=object)
+        self.entity_rows = {}
+        for entity, row in zip(entities, rows):
+            self.entity_rows[entity] = row
+            self.row_entities[row] = entity
+            self.update_entity_row(entity)
+        self._free_rows = list(free_rows)
+
+    def remove_entity(self, entity: Entity) -> None:
+        """Remove an entity from this map and from the location index."""
+        del self.entities[entity]
+        self._unindex(entity, entity.x, entity.y)
+
+        row = self.entity_rows.pop(entity)
+        self.entity_data[row] = 0
+        self.row_entities[row] = None
+        self._free_rows.append(row)
+
+        self.scheduler.remove(entity)
+
+    def relocate_entity(self, entity: Entity, old_x: int, old_y: int) -> None:
+        """Move an entity's index entry after its coordinates have changed."""
+        self._unindex(entity, old_x, old_y)
+        self.entity_index.setdefault((entity.x, entity.y), []).append(entity)
+
+        row = self.entity_data[self.entity_rows[entity]]
+        row["x"] = entity.x
+        row["y"] = entity.y
+
+    def update_entity_row(self, entity: Entity) -> None:
+        """Copy an entity's position, glyph and render order into its row of the entity table."""
+        self.entity_data[self.entity_rows[entity]] = (
+            entity.x, entity.y, ord(entity.char), entity.render_order.value
+        )
+
+    def _unindex(self, entity: Entity, x: int, y: int) -> None:
+        bucket = self.entity_index[x, y]
+        bucket.remove(entity)
+        if not bucket:
+            del self.entity_index[x, y]
+
+    def get_entities_at_location(self, x: int, y: int) -> Sequence[Entity]:
+        """Return the entities standing on the given tile."""
+        return self.entity_index.get((x, y), ())
+
     def get_blocking_entity_at_location(
         self, location_x: int, location_y: int,
     ) -> Optional[Entity]:
-        for entity in self.entities:
-            if (
-                entity.blocks_movement
-                and entity.x == location_x
-                and entity.y == location_y
-            ):
+        for entity in self.get_entities_at_location(location_x, location_y):
+            if entity.blocks_movement:
                 return entity
 
         return None
 
     def get_actor_at_location(self, x: int, y: int) -> Optional[Actor]:
-        for actor in self.actors:
-            if actor.x == x and actor.y == y:
-                return actor
+        for entity in self.get_entities_at_location(x, y):
+            if isinstance(entity, Actor) and entity.is_alive:
+                return entity
 
         return None
 
+    def _actor_rows(self) -> np.ndarray:
+        """Return the entity table rows of the living actors, the only rows drawn with the ACTOR render order."""
+        return np.flatnonzero(self.entity_data["render_order"] == RenderOrder.ACTOR.value)
+
+    def _actors(self, rows: np.ndarray) -> List[Actor]:
+        return [actor for actor in self.row_entities[rows] if actor.is_alive]
+
+    def actors_within_radius(self, x: int, y: int, radius: float) -> List[Actor]:
+        """Return the living actors at most 'radius' tiles from (x, y), measured like Entity.distance."""
+        rows = self._actor_rows()
+        data = self.entity_data[rows]
+        distance_squared = (data["x"] - x) ** 2 + (data["y"] - y) ** 2
+        return self._actors(rows[distance_squared <= radius ** 2])
+
+    def wake_actors_near(self, x: int, y: int, radius: int) -> None:
+        """Wake the parked actors at most 'radius' tiles from (x, y), in both directions."""
+        if not self.scheduler.parked:
+            return
+        rows = self._actor_rows()
+        data = self.entity_data[rows]
+        near = (np.abs(data["x"] - x) <= radius) & (np.abs(data["y"] - y) <= radius)
+        for actor in self.row_entities[rows[near]]:
+            self.scheduler.wake(actor)
+
+    def nearest_visible_actor(self, x: int, y: int, max_distance: float, exclude: Optional[Actor] = None) -> Optional[Actor]:
+        """Return the living actor in the player's FOV closest to (x, y) and nearer than 'max_distance', if any.
+
+        Ties between actors at the same distance are broken by their row in the entity table.
+        """
+        rows = self._actor_rows()
+        if exclude is not None and exclude in self.entity_rows:
+            rows = rows[rows != self.entity_rows[exclude]]
+        data = self.entity_data[rows]
+        distance_squared = (data["x"] - x) ** 2 + (data["y"] - y) ** 2
+        candidates = self.visible[data["x"], data["y"]] & (distance_squared < max_distance ** 2)
+        for actor in self._actors(rows[candidates][np.argsort(distance_squared[candidates], kind="stable")]):
+            return actor
+        return None
+
+    def actors_in_cone(self, x: int, y: int, target_x: int, target_y: int, radius: float, angle: float = 90) -> List[Actor]:
+        """Return the living actors in a cone from (x, y) toward (target_x, target_y).
+
+        The cone is 'angle' degrees wide and 'radius' tiles long. The actor at (x, y) itself is not included.
+        """
+        rows = self._actor_rows()
+        data = self.entity_data[rows]
+        dx, dy = data["x"] - x, data["y"] - y
+        distance = np.hypot(dx, dy)
+        aim_x, aim_y = target_x - x, target_y - y
+        aim_length = np.hypot(aim_x, aim_y)
+        if aim_length == 0:
+            return []
+        # Compare the cosine of the angle between each actor and the aim against the cosine of half the cone.
+        cosine = (dx * aim_x + dy * aim_y) / (np.maximum(distance, 1e-9) * aim_length)
+        inside = (distance > 0) & (distance <= radius) & (cosine >= np.cos(np.radians(angle / 2)))
+        return self._actors(rows[inside])
+
+    def actors_in_line(self, x: int, y: int, target_x: int, target_y: int) -> List[Actor]:
+        """Return the living actors on the Bresenham line from (x, y) to (target_x, target_y), nearest first.
+
+        The actor at (x, y) itself is not included.
+        """
+        line = tcod.los.bresenham((x, y), (target_x, target_y))[1:]
+        # Position of each map tile along the line, -1 off the line.
+        step = np.full((self.width, self.height), -1, dtype=np.int32, order="F")
+        line = line[(0 <= line[:, 0]) & (line[:, 0] < self.width) & (0 <= line[:, 1]) & (line[:, 1] < self.height)]
+        step[line[:, 0], line[:, 1]] = np.arange(len(line))
+
+        rows = self._actor_rows()
+        data = self.entity_data[rows]
+        actor_step = step[data["x"], data["y"]]
+        on_line = actor_step >= 0
+        return self._actors(rows[on_line][np.argsort(actor_step[on_line], kind="stable")])
+
+    def trace(self, x: int, y: int, target_x: int, target_y: int) -> Trace:
+        """Fly a projectile along the Bresenham line from (x, y) to (target_x, target_y), ignoring the origin.
+
+        It stops on the first living actor, before the first tile that is not walkable or at the target.
+        """
+        line = tcod.los.bresenham((x, y), (target_x, target_y))[1:]
+        walkable = self.tiles["walkable"][line[:, 0], line[:, 1]].tolist()
+
+        path: List[Tuple[int, int]] = []
+        for tile_xy, is_walkable in zip(map(tuple, line.tolist()), walkable):
+            if not is_walkable:
+                return Trace((x, y), path, hit_wall=True)
+            path.append(tile_xy)
+            actor = self.get_actor_at_location(*tile_xy)
+            if actor:
+                return Trace((x, y), path, hit_actor=actor)
+        return Trace((x, y), path)
+
     def in_bounds(self, x: int, y: int) -> bool:
         """Return True if x and y are inside the bounds of this map."""
         return 0 <= x < self.width and 0 <= y < self.height
 
+    def nearest_free_tile(self, x: int, y: int) -> Tuple[int, int]:
+        """Return the walkable tile nearest to (x, y) with nothing blocking on it, (x, y) itself if it is free."""
+        for radius in range(max(self.width, self.height)):
+            ring = [
+                (x + dx, y + dy)
+                for dx in range(-radius, radius + 1)
+                for dy in range(-radius, radius + 1)
+                if max(abs(dx), abs(dy)) == radius
+            ]
+            ring.sort(key=lambda xy: (xy[0] - x) ** 2 + (xy[1] - y) ** 2)
+            for tile_x, tile_y in ring:
+                if (
+                    self.in_bounds(tile_x, tile_y)
+                    and self.tiles["walkable"][tile_x, tile_y]
+                    and not self.get_blocking_entity_at_location(tile_x, tile_y)
+                ):
+                    return tile_x, tile_y
+        return x, y
+
     def render(self, console: Console) -> None:
         """
         Renders the map.
@@ -106,9 +340,19 @@ class GameMap:
 
 class GameWorld:
     """
-    Holds the settings for the GameMap, and generates new maps when moving down the stairs.
+    Holds the settings for the GameMap, and every floor visited so far keyed by depth.
+
+    The current floor and the ones next to it are kept as live GameMaps, the floor below is generated ahead of
+    time on a worker thread so taking the stairs only swaps maps. Floors further away are serialized on the same
+    worker into a temporary file, so memory use stays flat however deep the player goes.
+
+    Each floor is generated from its own stream of the engine's RNG, so a floor comes out the same whether it was
+    generated in the background or not.
     """
 
+    # Floors this many levels away from the current one stay live.
+    live_floor_radius = 1
+
     def __init__(
             self,
             *,
@@ -120,6 +364,8 @@ class GameWorld:
             room_max_size: int,
             current_floor: int = 0,
     ):
+        from savefile import FloorStore
+
         self.engine = engine
 
         self.map_width = map_width
@@ -132,16 +378,128 @@ class GameWorld:
 
         self.current_floor = current_floor
 
-    def generate_floor(self) -> None:
-        from procgen import generate_dungeon
+        self.floors: Dict[int, GameMap] = {}
+        self.stored_floors = FloorStore()
+
+        self.executor: Optional[ThreadPoolExecutor] = None  # Started on the first background generation.
+        self.pending_floors: Dict[int, Future[GameMap]] = {}
+        self.storing_floors: Dict[int, Tuple[GameMap, Future[bytes]]] = {}
+
+    def __getstate__(self) -> Dict[str, Any]:
+        """Pickle without the worker thread and the temporary file.
+
+        Stored floors, and floors still being stored, are kept as their serialized bytes. Floors still being
+        generated are dropped, they come out the same when generated again.
+        """
+        state = self.__dict__.copy()
+        state["stored_floors"] = {
+            depth: data for depth, data in self.serialized_floors() if depth not in self.floors
+        }
+        state["executor"] = None
+        state["pending_floors"] = {}
+        state["storing_floors"] = {}
+        return state
 
-        self.current_floor += 1
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        from savefile import FloorStore
 
-        self.engine.game_map = generate_dungeon(
+        stored_floors = FloorStore()
+        for depth, data in state["stored_floors"].items():
+            stored_floors[depth] = data
+        self.__dict__.update(state, stored_floors=stored_floors)
+
+    def create_floor(self, depth: int) -> GameMap:
+        """Generate a new floor for 'depth'."""
+        from procgen import generate_dungeon
+
+        return generate_dungeon(
             max_rooms=self.max_rooms,
             room_min_size=self.room_min_size,
             room_max_size=self.room_max_size,
             map_width=self.map_width,
             map_height=self.map_height,
+            floor_number=depth,
             engine=self.engine,
+            rng=self.engine.rng.floor(depth),
         )
+
+    def get_floor(self, depth: int) -> GameMap:
+        """Return the floor at 'depth', loading or generating it if it is not live."""
+        if depth not in self.floors:
+            if depth in self.pending_floors:
+                future = self.pending_floors.pop(depth)
+                # If the worker never got to it, generating it here is quicker than waiting in line.
+                self.floors[depth] = self.create_floor(depth) if future.cancel() else future.result()
+            elif depth in self.storing_floors:
+                game_map, stored = self.storing_floors.pop(depth)
+                if not stored.cancel():
+                    stored.exception()  # Wait until the worker is done reading the map, whatever the outcome.
+                self.floors[depth] = game_map
+            elif depth in self.stored_floors:
+                from savefile import load_floor
+
+                self.floors[depth] = load_floor(self.stored_floors.pop(depth), self.engine)
+            else:
+                self.floors[depth] = self.create_floor(depth)
+        return self.floors[depth]
+
+    def prepare_next_floor(self) -> None:
+        """Start generating the floor below the current one in the background, if it does not exist yet."""
+        depth = self.current_floor + 1
+        if any(depth in floors for floors in (self.floors, self.pending_floors, self.storing_floors)):
+            return
+        if depth in self.stored_floors:
+            return
+        self.pending_floors[depth] = self.get_executor().submit(self.create_floor, depth)
+
+    def get_executor(self) -> ThreadPoolExecutor:
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="floor-generation")
+        return self.executor
+
+    def store_distant_floors(self) -> None:
+        """Start serializing the live floors too far from the current one, and keep the ones that are done."""
+        from savefile import dump_floor
+
+        for depth in list(self.floors):
+            if abs(depth - self.current_floor) > self.live_floor_radius:
+                game_map = self.floors.pop(depth)
+                self.storing_floors[depth] = game_map, self.get_executor().submit(dump_floor, game_map)
+
+        for depth, (_, stored) in list(self.storing_floors.items()):
+            if stored.done():
+                self.stored_floors[depth] = stored.result()
+                del self.storing_floors[depth]
+
+    def serialized_floors(self) -> Iterator[Tuple[int, bytes]]:
+        """Yield every floor except the current one as (depth, serialized floor).
+
+        Floors still being generated are left out, they come out the same when generated again from the seed.
+        """
+        from savefile import dump_floor
+
+        for depth in sorted(self.floors):
+            if depth != self.current_floor:
+                yield depth, dump_floor(self.floors[depth])
+        for depth, (_, stored) in sorted(self.storing_floors.items()):
+            yield depth, stored.result()
+        for depth in self.stored_floors:
+            yield depth, self.stored_floors[depth]
+
+    def change_floor(self, depth: int) -> None:
+        """Move the player to the floor at 'depth', arriving on the stairs back to the floor they left."""
+        going_down = depth > self.current_floor
+        game_map = self.get_floor(depth)
+
+        self.current_floor = depth
+        self.engine.game_map = game_map
+        # A monster may be standing on the stairs of a floor visited before, the player then arrives next to them.
+        stairs = game_map.upstairs_location if going_down else game_map.downstairs_location
+        self.engine.player.place(*game_map.nearest_free_tile(*stairs), game_map)
+
+        self.store_distant_floors()
+        self.prepare_next_floor()
+
+    def generate_floor(self) -> None:
+        """Descend to the next floor."""
+        self.change_floor(self.current_floor + 1)
@@ -1,16 +1,16 @@
 from __future__ import annotations
-from hashlib import new
 
 import os
 
-from typing import Callable, Optional, Tuple, TYPE_CHECKING, Union, List
+from typing import Any, Callable, Hashable, Optional, Tuple, TYPE_CHECKING, Union, List
 
+import numpy as np  # type: ignore
 import tcod
 import tcod.event
 import traceback
 
 import actions
-import animations
+import assets
 from actions import (
     Action,
     BumpAction,
@@ -19,7 +19,6 @@ from actions import (
 )
 import color
 import exceptions
-import setup_game
 from equipment_types import EquipmentType
 
 if TYPE_CHECKING:
@@ -76,6 +75,21 @@ MainGameEventHandler will become the active handler.
 """
 
 
+def snapshot_console(console: tcod.Console) -> np.ndarray:
+    """Return a copy of the console's tiles to give to 'restore_console'.
+
+    The copy keeps the memory layout of the console and is viewed as raw bytes, so restoring it is a plain memory
+    copy instead of a field by field one.
+    """
+    rgba = np.copy(console.rgba, order="K")
+    return rgba.view(np.dtype((np.void, rgba.dtype.itemsize)))
+
+
+def restore_console(console: tcod.Console, snapshot: np.ndarray) -> None:
+    """Put the tiles from 'snapshot_console' back onto a console of the same size."""
+    console.rgba.view(snapshot.dtype)[:] = snapshot
+
+
 class BaseEventHandler(tcod.event.EventDispatch[ActionOrHandler]):
     def handle_events(self, event: tcod.event.Event) -> BaseEventHandler:
         """Handle an event and return the next active event handler."""
@@ -85,6 +99,11 @@ class BaseEventHandler(tcod.event.EventDispatch[ActionOrHandler]):
         assert not isinstance(state, Action), f"{self!r} can not handle actions."
         return self
 
+    @property
+    def is_animating(self) -> bool:
+        """True while this handler has animations playing, so every frame has to be redrawn."""
+        return False
+
     def on_render(self, b_console: tcod.Console, i_console: tcod.Console, m_console: tcod.Console, a_console: tcod.Console, ui_console: tcod.Console) -> None:
         raise NotImplementedError()
 
@@ -93,26 +112,35 @@ class BaseEventHandler(tcod.event.EventDispatch[ActionOrHandler]):
 
 
 class PopupMessage(BaseEventHandler):
-    """Display a popup text window."""
+    """Display a popup text window.
+
+    The parent's frame is drawn, dimmed and captured once, then copied into every frame the popup stays open.
+    """
 
     def __init__(self, parent_handler: BaseEventHandler, text: str):
         self.parent = parent_handler
         self.text = text
+        self._frame_key: Any = None
+        self._frame: Tuple[np.ndarray, ...] = ()  # Snapshots of the five consoles with the popup drawn.
+
+    @property
+    def is_animating(self) -> bool:
+        return False  # The parent's animations stand still under the popup.
 
     def on_render(self, b_console: tcod.Console, i_console: tcod.Console, m_console: tcod.Console, a_console: tcod.Console, ui_console: tcod.Console) -> None:
         """Render the parent and dim the result, then print the message on top."""
+        consoles = (b_console, i_console, m_console, a_console, ui_console)
+        frame_key = tuple(console.rgba.shape for console in consoles)
+        if frame_key == self._frame_key:
+            for console, snapshot in zip(consoles, self._frame):
+                restore_console(console, snapshot)
+            return
+
         self.parent.on_render(b_console, i_console, m_console, a_console, ui_console)
-        
-        b_console.rgba["fg"] //= 8
-        b_console.rgba["bg"] //= 8
-        i_console.rgba["fg"] //= 8
-        i_console.rgba["bg"] //= 8
-        m_console.rgba["fg"] //= 8
-        m_console.rgba["bg"] //= 8
-        a_console.rgba["fg"] //= 8
-        a_console.rgba["bg"] //= 8
-        ui_console.rgba["fg"] //= 8
-        ui_console.rgba["bg"] //= 8
+
+        for console in consoles:
+            console.rgba["fg"] //= 8
+            console.rgba["bg"] //= 8
 
         ui_console.print(
             ui_console.width // 2,
@@ -122,6 +150,8 @@ class PopupMessage(BaseEventHandler):
             bg=color.black,
             alignment=tcod.CENTER,
         )
+        self._frame = tuple(snapshot_console(console) for console in consoles)
+        self._frame_key = frame_key
 
     def ev_keydown(self, event: "tcod.event.KeyDown") -> Optional[BaseEventHandler]:
         """Any key returns to the parent event handler."""
@@ -143,9 +173,12 @@ class QuitConfirm(PopupMessage):
 
 
 class EventHandler(BaseEventHandler):
-    def __init__(self, engine: Engine, animation: Optional[list[animations.BaseAnimation]] = []):
+    def __init__(self, engine: Engine):
         self.engine = engine
-        self.animation = animation
+
+    @property
+    def is_animating(self) -> bool:
+        return bool(self.engine.animator)
 
     def handle_events(self, event: tcod.event.Event) -> BaseEventHandler:
         """Handle events for input handlers with an engine."""
@@ -161,7 +194,7 @@ class EventHandler(BaseEventHandler):
                 return GameOverEventHandler(self.engine)
             elif self.engine.player.level.requires_level_up:
                 return LevelUpEventHandler(self.engine)
-            return MainGameEventHandler(self.engine, self.animation)  # Return to the main handler.
+            return MainGameEventHandler(self.engine)  # Return to the main handler.
         return self
 
     def handle_action(self, action: Optional[Action]) -> bool:
@@ -175,47 +208,16 @@ class EventHandler(BaseEventHandler):
         try:
             new_animations = action.perform()
 
-            # get any animations from the action and append them to queued animations
+            # start playing any animations from the action
             if new_animations is not None:
-                if len(new_animations) > 0:
-                    for i in new_animations:
-                        self.animation.append(i)
+                self.engine.animator.add(new_animations)
 
         except exceptions.Impossible as exc:
             self.engine.message_log.add_message(exc.args[0], color.impossible)
             return False  # Skip enemy turn on exceptions.
 
-        # if player speed is not default
-        if self.engine.player.speed != 0:
-
-            # if player is fast, then give them extra turns 
-            if self.engine.player.speed > 0:
-                if self.engine.player.turn_skip > 0:
-                    self.engine.player.turn_skip -= 1
-                elif self.engine.player.turn_skip <= 0:
-                    new_animations = self.engine.handle_enemy_turns()
-                    
-                    if len(new_animations) > 0:
-                        for i in new_animations:
-                            self.animation.append(i)
-                    
-                    self.engine.player.reset_turn_skip()
-
-            # if player is slow, then give the monsters extra turns
-            else:
-                for i in range(self.engine.player.speed, 1):
-                    new_animations = self.engine.handle_enemy_turns()
-                    
-                    if len(new_animations) > 0:
-                        for i in new_animations:
-                            self.animation.append(i)
-        
-        # if speed is default just take monster turn as normal
-        else:
-            new_animations = self.engine.handle_enemy_turns()        
-            if len(new_animations) > 0:
-                for i in new_animations:
-                    self.animation.append(i)
+        # other actors get as much time as the player's action took, see Engine.handle_enemy_turns
+        self.engine.animator.add(self.engine.handle_enemy_turns())
 
         self.engine.update_fov()
         return True
@@ -226,13 +228,7 @@ class EventHandler(BaseEventHandler):
 
     def on_render(self, b_console: tcod.Console, i_console: tcod.Console, m_console: tcod.Console, a_console: tcod.Console, ui_console: tcod.Console) -> None:
         self.engine.render(b_console, i_console, m_console, ui_console)
-
-        # check if any animations are queued to play
-        if len(self.animation) > 0:
-            for i in self.animation:
-                done = i.anim_render(a_console, self.engine)
-                if done:
-                    self.animation.remove(i)  # when animations are done, remove them from queue
+        self.engine.animator.render(a_console, self.engine.viewport.x_offset, self.engine.viewport.y_offset)
 
 
 class AskUserEventHandler(EventHandler):
@@ -265,12 +261,66 @@ class AskUserEventHandler(EventHandler):
         return MainGameEventHandler(self.engine)
 
 
-class CharacterScreenEventHandler(AskUserEventHandler):
-    TITLE = "Character Information"
+class MenuEventHandler(AskUserEventHandler):
+    """A menu panel drawn over the game, which stands still while the menu is open.
+
+    The map layers are drawn once and copied into every frame after that, and the panel is only drawn again when
+    'panel_key' changes, so an open menu costs a few array copies per frame.
+    """
+
+    def __init__(self, engine: Engine):
+        super().__init__(engine)
+        self._background_key: Any = None
+        self._background: Tuple[np.ndarray, ...] = ()  # Snapshots of the background, item, monster and UI consoles.
+        self._frame_key: Any = None
+        self._frame_ui: Optional[np.ndarray] = None  # Snapshot of the UI console with the panel drawn on it.
+
+    @property
+    def is_animating(self) -> bool:
+        return False  # Animations are not drawn under a menu.
+
+    def panel_key(self) -> Hashable:
+        """Everything the panel depends on that can change while the menu is open."""
+        return None
+
+    def render_panel(self, ui_console: tcod.Console) -> None:
+        """Draw the menu onto the UI console."""
+        raise NotImplementedError()
 
     def on_render(self, b_console: tcod.Console, i_console: tcod.Console, m_console: tcod.Console, a_console: tcod.Console, ui_console: tcod.Console) -> None:
-        super().on_render(b_console, i_console, m_console, a_console, ui_console)
+        consoles = (b_console, i_console, m_console, ui_console)
+        # The mouse still moves the names under it, and invalid keys still log a message.
+        message_log = self.engine.message_log.messages
+        last_message = message_log[-1] if message_log else None
+        background_key = (
+            tuple(console.rgba.shape for console in consoles),
+            self.engine.mouse_location,
+            last_message,
+            last_message and last_message.count,
+        )
+        if background_key != self._background_key:
+            self.engine.render(b_console, i_console, m_console, ui_console)
+            self._background = tuple(snapshot_console(console) for console in consoles)
+            self._background_key = background_key
+            self._frame_ui = None
+        else:
+            for console, snapshot in zip(consoles[:3], self._background):
+                restore_console(console, snapshot)
+
+        frame_key = self.panel_key()
+        if frame_key != self._frame_key or self._frame_ui is None:
+            restore_console(ui_console, self._background[3])
+            self.render_panel(ui_console)
+            self._frame_ui = snapshot_console(ui_console)
+            self._frame_key = frame_key
+        else:
+            restore_console(ui_console, self._frame_ui)
 
+
+class CharacterScreenEventHandler(MenuEventHandler):
+    TITLE = "Character Information"
+
+    def render_panel(self, ui_console: tcod.Console) -> None:
         y = 0
 
         width = len(self.TITLE) + 4
@@ -325,7 +375,7 @@ class CharacterScreenEventHandler(AskUserEventHandler):
         )
 
 
-class LevelUpEventHandler(AskUserEventHandler):
+class LevelUpEventHandler(MenuEventHandler):
     TITLE = "Level Up"
 
     # TODO: finish feats
@@ -338,9 +388,7 @@ class LevelUpEventHandler(AskUserEventHandler):
             if player_class == 'fighter':
                 pass
     
-    def on_render(self, b_console: tcod.Console, i_console: tcod.Console, m_console: tcod.Console, a_console: tcod.Console, ui_console: tcod.Console) -> None:
-        super().on_render(b_console, i_console, m_console, a_console, ui_console)
-
+    def render_panel(self, ui_console: tcod.Console) -> None:
         next_choice = self.engine.player.fighter.player_class.choice_reason[0]
 
         if self.engine.player.x <= 30:
@@ -417,7 +465,7 @@ class LevelUpEventHandler(AskUserEventHandler):
         return None
 
 
-class InventoryEventHandler(AskUserEventHandler):
+class InventoryEventHandler(MenuEventHandler):
     """This handler lets the user select an item.
 
     What happens then is up to the subclass.
@@ -427,23 +475,22 @@ class InventoryEventHandler(AskUserEventHandler):
 
     def __init__(self, engine: Engine):
         super().__init__(engine)
-        self.number_of_items_in_inventory = len(self.engine.player.inventory.items_stacked)
+        # The inventory can not change while the menu is open, so the stacks are looked up once.
+        self.item_stacks = self.engine.player.inventory.items_stacked
+        self.number_of_items_in_inventory = len(self.item_stacks)
         self.cursor = 0
 
-    def on_render(self, b_console: tcod.Console, i_console: tcod.Console, m_console: tcod.Console, a_console: tcod.Console, ui_console: tcod.Console) -> None:
+    def panel_key(self) -> Hashable:
+        return self.cursor
+
+    def render_panel(self, ui_console: tcod.Console) -> None:
         """Render an inventory menu, which displays the items in the inventory, and the letter to select them.
         Will move to a different position based on where the player is located, so the player can always see where
         they are.
         """
-        super().on_render(b_console, i_console, m_console, a_console, ui_console)
-
         console = ui_console
 
-        max_name = 0
-        for item in self.engine.player.inventory.items:
-            if max_name < len(item.name):
-                max_name = len(item.name)
-        
+        max_name = max((len(item_list[0].name) for item_list in self.item_stacks), default=0)
 
         height = self.number_of_items_in_inventory + 2
 
@@ -478,7 +525,7 @@ class InventoryEventHandler(AskUserEventHandler):
         )
 
         if self.number_of_items_in_inventory > 0:
-            for i, item_list in enumerate(self.engine.player.inventory.items_stacked):
+            for i, item_list in enumerate(self.item_stacks):
                 item = item_list[0]
                 
                 item_key = chr(ord("a") + i)
@@ -593,7 +640,7 @@ class InventoryEventHandler(AskUserEventHandler):
 
         if 0 <= index <= 26:
             try:
-                selected_item = player.inventory.items_stacked[index]
+                selected_item = self.item_stacks[index]
             except IndexError:
                 self.engine.message_log.add_message("Invalid entry.", color.invalid)
                 return None
@@ -613,7 +660,7 @@ class InventoryEventHandler(AskUserEventHandler):
             return None
 
         elif key in CONFIRM_KEYS:
-            selected_item = player.inventory.items_stacked[self.cursor]
+            selected_item = self.item_stacks[self.cursor]
             return self.on_item_selected(selected_item[0])
 
         return super().ev_keydown(event)
@@ -662,13 +709,8 @@ class SelectIndexHandler(AskUserEventHandler):
         x, y = self.engine.mouse_location
 
         self.engine.render(b_console, i_console, m_console, ui_console, self.engine.mouse_location)
-        # check if any animations are queued to play
-        if len(self.animation) > 0:
-            for i in self.animation:
-                done = i.anim_render(a_console, self.engine)
-                if done:
-                    self.animation.remove(i)  # when animations are done, remove them from queue
-        
+        self.engine.animator.render(a_console, self.engine.viewport.x_offset, self.engine.viewport.y_offset)
+
         a_console.rgba[x+self.engine.viewport.x_offset, y+self.engine.viewport.y_offset] = (0xE007, (255, 255, 255, 255), (0, 0, 0, 0))
 
     def ev_keydown(self, event: "tcod.event.KeyDown") -> Optional[ActionOrHandler]:
@@ -780,7 +822,7 @@ class MainGameEventHandler(EventHandler):
 
         player = self.engine.player
 
-        if key == tcod.event.K_PERIOD and modifier & (
+        if key in (tcod.event.K_PERIOD, tcod.event.K_COMMA) and modifier & (
             tcod.event.KMOD_LSHIFT | tcod.event.KMOD_RSHIFT
         ):
             return actions.TakeStairsAction(player)
@@ -824,6 +866,10 @@ class GameOverEventHandler(EventHandler):
         """Handle exiting out of a finished game."""
         if os.path.exists("savegame.sav"):
             os.remove("savegame.sav")  # Deletes the active save file.
+        import setup_game
+
+        if os.path.exists(setup_game.MESSAGE_ARCHIVE):
+            os.remove(setup_game.MESSAGE_ARCHIVE)
         raise exceptions.QuitWithoutSaving()  # Avoid saving a finished game.
 
     def ev_quit(self, event: tcod.event.Quit) -> None:
@@ -866,7 +912,8 @@ class HistoryViewer(EventHandler):
     """Print the message history on a larger window which can be navigated."""
     def __init__(self, engine: Engine):
         super().__init__(engine)
-        self.log_length = len(engine.message_log.messages)
+        self.messages = engine.message_log.history()
+        self.log_length = len(self.messages)
         self.cursor = self.log_length - 1
 
     def on_render(self, b_console: tcod.Console, i_console: tcod.Console, m_console: tcod.Console, a_console: tcod.Console, ui_console: tcod.Console) -> None:
@@ -880,14 +927,16 @@ class HistoryViewer(EventHandler):
             0, 0, log_console.width, 1, "-|Message History|-", alignment=tcod.CENTER
         )
 
-        # Render the message log using the cursor parameter.
+        # Render the message log using the cursor parameter. Every message takes at least one line, so no more
+        # messages than the height of the box can be shown.
+        height = log_console.height - 2
         self.engine.message_log.render_messages(
             log_console,
             1,
             1,
             log_console.width - 2,
-            log_console.height - 2,
-            self.engine.message_log.messages[: self.cursor + 1],
+            height,
+            self.messages[max(0, self.cursor + 1 - height) : self.cursor + 1],
         )
         log_console.blit(ui_console, 3, 3)
 
@@ -914,11 +963,18 @@ class HistoryViewer(EventHandler):
         return None
 
 class MainMenu(BaseEventHandler):
-    """Handle the main menu rendering and input."""
+    """Handle the main menu rendering and input.
+
+    setup_game, and with it the engine, map generation, entity factories and save code, is only imported once a game
+    is started or loaded, so the menu comes up without waiting for them.
+    """
+
+    def __init__(self, seed: Optional[int] = None):
+        self.seed = seed  # Seed for new games, random if None.
 
     def on_render(self, b_console: tcod.Console, i_console: tcod.Console, m_console: tcod.Console, a_console: tcod.Console, ui_console: tcod.Console) -> None:
         """Render the main menu on a background image."""
-        ui_console.draw_semigraphics(setup_game.background_image, 0, 0)
+        ui_console.draw_semigraphics(assets.menu_background(), 0, 0)
 
         ui_console.print(
             ui_console.width // 2,
@@ -957,6 +1013,8 @@ class MainMenu(BaseEventHandler):
         if event.sym in (tcod.event.K_q, tcod.event.K_ESCAPE):
             raise SystemExit()
         elif event.sym == tcod.event.K_c:
+            import setup_game
+
             try:
                 return MainGameEventHandler(setup_game.load_game("savegame.sav"))
             except FileNotFoundError:
@@ -965,6 +1023,8 @@ class MainMenu(BaseEventHandler):
                 traceback.print_exc()  # Print to stderr.
                 return PopupMessage(self, f"Failed to load save:\n{exc}")
         elif event.sym == tcod.event.K_n:
-            return MainGameEventHandler(setup_game.new_game())
+            import setup_game
+
+            return MainGameEventHandler(setup_game.new_game(self.seed))
 
         return None
@@ -1,15 +1,47 @@
 #!/usr/bin/env python3
+import time
+
+STARTED = time.perf_counter()  # Before the other imports, so --profile-startup can time them.
+
+import argparse
+import json
+import sys
 import traceback
+from typing import Dict, Optional, Tuple
 
 import tcod
 import tcod.render
 import tcod.sdl.render
 import tcod.sdl.video
 
+import assets
 import color
 import exceptions
 import input_handlers
-import tilemaps
+
+IMPORTED = time.perf_counter()
+
+# Seconds to block waiting for input when the frame is unchanged.
+IDLE_FRAME_TIMEOUT = 0.1
+
+
+class StartupProfile:
+    """Seconds spent in each step from starting the program to showing the main menu."""
+
+    def __init__(self) -> None:
+        self.steps: Dict[str, float] = {"imports": IMPORTED - STARTED}
+        self.last = time.perf_counter()
+
+    def lap(self, step: str) -> None:
+        """Record the time since the previous step as 'step'."""
+        now = time.perf_counter()
+        self.steps[step] = now - self.last
+        self.last = now
+
+    def report(self) -> None:
+        steps = {step: round(seconds * 1000, 2) for step, seconds in self.steps.items()}
+        steps["total"] = round((self.last - STARTED) * 1000, 2)
+        print(json.dumps({"startup_ms": steps}, indent=2), file=sys.stderr)
 
 
 def save_game(handler: input_handlers.BaseEventHandler, filename: str) -> None:
@@ -18,36 +50,68 @@ def save_game(handler: input_handlers.BaseEventHandler, filename: str) -> None:
         handler.engine.save_as(filename)
         print("Game Saved.")
 
+class RenderCache:
+    """Keeps the frame's consoles alive between frames and tracks whether the frame needs redrawing.
+
+    The consoles are only reallocated when the window size or the magnification changes, and a frame is only
+    redrawn when something marked it dirty: an input event, a handler change or a running animation.
+    """
+
+    def __init__(self) -> None:
+        self.consoles: Optional[Tuple[tcod.console.Console, ...]] = None
+        self.key: Optional[Tuple[Tuple[int, int], float]] = None
+        self.handler: Optional[input_handlers.BaseEventHandler] = None
+        self.dirty = True
+
+    def get_consoles(self, context: tcod.context.Context, mag: float) -> Tuple[tcod.console.Console, ...]:
+        """Return the background, item, monster, animation and UI consoles, reallocating them if needed."""
+        key = (context.sdl_renderer.output_size, mag)
+        if self.consoles is None or key != self.key:
+            self.key = key
+            self.consoles = (
+                context.new_console(magnification=mag, order="F"),  # base map objects (background console)
+                context.new_console(magnification=mag, order="F"),  # items
+                context.new_console(magnification=mag, order="F"),  # actors (monster console)
+                context.new_console(magnification=mag, order="F"),  # animations
+                context.new_console(magnification=0.5, order="F"),  # UI elements
+            )
+            self.dirty = True
+        return self.consoles
+
+
 def render_context(
     context: tcod.context.Context, 
     console_render_tiles: tcod.render.SDLConsoleRender,
     console_render_text: tcod.render.SDLConsoleRender,
-    handler: input_handlers.BaseEventHandler
-) -> None:
-    """Render the given context using the provided console render and input handler."""
+    handler: input_handlers.BaseEventHandler,
+    render_cache: RenderCache,
+) -> bool:
+    """Render the given context using the provided console render and input handler.
+
+    Returns False without drawing anything if nothing changed since the last frame.
+    """
 
     try:
         mag = handler.engine.magnification
     except AttributeError:
         mag = 2
-    
-    # console to render base map objects (background console)
-    b_console = context.new_console(magnification=mag, order="F")
 
-    # console to render items
-    i_console = context.new_console(magnification=mag, order="F")
-    i_console.rgba[:] = 0x20, (0, 0, 0, 0), (0, 0, 0, 0)
+    b_console, i_console, m_console, a_console, ui_console = render_cache.get_consoles(context, mag)
 
-    # console to render actors (monster console)
-    m_console = context.new_console(magnification=mag, order="F")
-    m_console.rgba[:] = 0x20, (0, 0, 0, 0), (0, 0, 0, 0)
+    if handler is not render_cache.handler:
+        render_cache.handler = handler
+        render_cache.dirty = True
 
-    # console to render animations
-    a_console = context.new_console(magnification=mag, order="F")
-    a_console.rgba[:] = 0x20, (0, 0, 0, 0), (0, 0, 0, 0)
+    if not render_cache.dirty:
+        return False
+
+    # Keep redrawing until the frame after the last animation finishes, so its final glyphs get cleared.
+    animating = handler.is_animating
 
-    # console to render UI elements
-    ui_console=context.new_console(magnification=0.5, order="F")
+    b_console.clear()
+    i_console.rgba[:] = 0x20, (0, 0, 0, 0), (0, 0, 0, 0)
+    m_console.rgba[:] = 0x20, (0, 0, 0, 0), (0, 0, 0, 0)
+    a_console.rgba[:] = 0x20, (0, 0, 0, 0), (0, 0, 0, 0)
     ui_console.rgba[:] = 0x20, (0, 0, 0, 0), (0, 0, 0, 0)
     
     handler.on_render(b_console, i_console, m_console, a_console, ui_console)
@@ -68,22 +132,22 @@ def render_context(
     
     context.sdl_renderer.present()
 
-def main() -> None:
+    render_cache.dirty = animating
+    return True
+
+def main(seed: Optional[int] = None, profile_startup: bool = False) -> None:
+    """Run the game. With 'profile_startup', quit once the main menu is shown and report how long each step took."""
+    startup = StartupProfile()
     screen_width = 720
     screen_height = 480
 
     flags = tcod.context.SDL_WINDOW_RESIZABLE | tcod.context.SDL_WINDOW_MAXIMIZED
 
-    tileset = tcod.tileset.load_tilesheet(
-        #"dejavu10x10_gs_tc.png", 32, 8, tcod.tileset.CHARMAP_TCOD
-        "Talryth_square_15x15.png",16 ,16, tcod.tileset.CHARMAP_CP437
-    )
-
-    tileset_gfx = tcod.tileset.load_tilesheet(
-        "wmss_32x32.png", 10, 10, tilemaps.main_tilemap
-    )
+    tileset = assets.text_tileset()
+    tileset_gfx = assets.map_tileset()
+    startup.lap("tilesets")
 
-    handler: input_handlers.BaseEventHandler = input_handlers.MainMenu()
+    handler: input_handlers.BaseEventHandler = input_handlers.MainMenu(seed)
     
     with tcod.context.new(
         width=screen_width,
@@ -102,13 +166,25 @@ def main() -> None:
 
         context.sdl_renderer.integer_scaling = True
 
+        render_cache = RenderCache()
+        startup.lap("window")
+
         while True:
             try:
                 while True:
                     context.sdl_renderer.draw_blend_mode = 1
-                    render_context(context, console_render_tiles, console_render_text, handler)
+                    if render_context(context, console_render_tiles, console_render_text, handler, render_cache):
+                        if profile_startup:
+                            startup.lap("first_frame")
+                            startup.report()
+                            return
+                        events = tcod.event.get()
+                    else:
+                        # Nothing changed, so sleep until there is input instead of spinning.
+                        events = tcod.event.wait(timeout=IDLE_FRAME_TIMEOUT)
                     try:
-                        for event in tcod.event.get():
+                        for event in events:
+                            render_cache.dirty = True
                             context.convert_event(event)
                             handler = handler.handle_events(event)
                     except Exception:  # Handle exceptions in game.
@@ -132,8 +208,9 @@ def main() -> None:
                 # get user input and render until quit is confirmed/canceled (basically mini main loop)
                 done = False
                 while not done:
-                    render_context(context, console_render_tiles, console_render_text, handler)
+                    render_context(context, console_render_tiles, console_render_text, handler, render_cache)
                     for event in tcod.event.wait():
+                        render_cache.dirty = True
                         # only care about key events
                         if isinstance(event, tcod.event.KeyDown):
                             try:
@@ -155,4 +232,10 @@ def main() -> None:
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Play TrollBlaster 64.")
+    parser.add_argument("--seed", type=int, help="seed for new games, so a run can be replayed")
+    parser.add_argument(
+        "--profile-startup", action="store_true", help="quit once the main menu is shown and report startup times"
+    )
+    args = parser.parse_args()
+    main(args.seed, profile_startup=args.profile_startup)
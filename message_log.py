@@ -1,16 +1,49 @@
-from typing import Iterable, List, Reversible, Tuple
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, List, Optional, Reversible, Set, Tuple
+import json
 import textwrap
 
 import tcod
 
 import color
 
+# Messages kept in memory, older ones are dropped or moved to the archive file.
+MESSAGE_CAPACITY = 1000
+# Dropped messages are written to the archive in batches of this many.
+ARCHIVE_BATCH = 100
+
+# Verbosity levels. An event is only logged if its level is at most the log's verbosity.
+QUIET = 0  # Nothing but plain messages.
+NORMAL = 1
+VERBOSE = 2
+
+# Event category -> (text template, verbosity level). The template is formatted with the event's arguments.
+EVENTS: Dict[str, Tuple[str, int]] = {
+    "to_hit": ("{0} rolls a {1} + {2} to hit {3}.", VERBOSE),
+    "critical": ("That was a critical hit!", NORMAL),
+    "hit": ("{0} kicks {1} for {2} damage.", NORMAL),  # TODO: pull attack desc from attack itself
+    "miss": ("{0} misses {1}.", NORMAL),
+}
+
 
 class Message:
-    def __init__(self, text: str, fg: Tuple[int, int, int]):
-        self.plain_text = text
+    """A line of the log. With 'args' the text is a template, only formatted once the message is shown."""
+
+    def __init__(self, text: str, fg: Tuple[int, int, int], args: Tuple[Any, ...] = ()):
+        self.template = text
+        self.args = args
         self.fg = fg
         self.count = 1
+        self._text: Optional[str] = None if args else text
+        self._lines: Dict[int, List[str]] = {}  # Width -> the wrapped lines of full_text at that width.
+        self._lines_count = 1  # The count '_lines' was wrapped with.
+
+    @property
+    def plain_text(self) -> str:
+        """The text of this message, formatted from its template the first time it is needed."""
+        if self._text is None:
+            self._text = self.template.format(*self.args)
+        return self._text
 
     @property
     def full_text(self) -> str:
@@ -19,10 +52,61 @@ class Message:
             return f"{self.plain_text} (x{self.count})"
         return self.plain_text
 
+    def wrapped(self, width: int) -> List[str]:
+        """Return full_text wrapped to 'width', only wrapping it again when the width or the count changes."""
+        if self._lines_count != self.count:
+            self._lines.clear()
+            self._lines_count = self.count
+        lines = self._lines.get(width)
+        if lines is None:
+            lines = self._lines[width] = list(MessageLog.wrap(self.full_text, width))
+        return lines
+
 
 class MessageLog:
-    def __init__(self) -> None:
-        self.messages: List[Message] = []
+    """The latest messages in a ring buffer of 'capacity' messages.
+
+    If 'archive_path' is set, the messages that fall out of the buffer are appended to that file as JSON lines, so
+    the whole history can still be read back with 'history'.
+    """
+
+    def __init__(self, capacity: int = MESSAGE_CAPACITY, archive_path: Optional[str] = None) -> None:
+        self.messages: Deque[Message] = deque(maxlen=capacity)
+        self.archive_path = archive_path
+        self._unarchived: List[Message] = []  # Dropped from 'messages' but not written to the archive yet.
+        self.verbosity = VERBOSE
+        self.muted: Set[str] = set()  # Event categories that are never logged.
+
+    def open_archive(self, archive_path: str) -> None:
+        """Start a new, empty archive at 'archive_path'."""
+        open(archive_path, "w").close()
+        self.archive_path = archive_path
+        self._unarchived.clear()
+
+    def flush(self) -> None:
+        """Write the dropped messages still in memory to the archive."""
+        if not self._unarchived:
+            return
+        with open(self.archive_path, "a") as f:
+            for message in self._unarchived:
+                f.write(json.dumps([message.plain_text, list(message.fg), message.count]) + "\n")
+        self._unarchived.clear()
+
+    def history(self) -> List[Message]:
+        """Return every message, oldest first, including those in the archive."""
+        archived = []
+        if self.archive_path is not None:
+            self.flush()
+            try:
+                with open(self.archive_path) as f:
+                    for line in f:
+                        text, fg, count = json.loads(line)
+                        message = Message(text, tuple(fg))
+                        message.count = count
+                        archived.append(message)
+            except FileNotFoundError:
+                pass
+        return archived + list(self.messages)
 
     def add_message(
         self, text: str, fg: Tuple[int, int, int] = color.white, *, stack: bool = True,
@@ -32,10 +116,28 @@ class MessageLog:
         If 'stack' is True then the message can stack with a previous message
         of the same text.
         """
-        if stack and self.messages and text == self.messages[-1].plain_text:
+        self._append(text, (), fg, stack)
+
+    def add_event(self, category: str, fg: Tuple[int, int, int], *args: Any) -> None:
+        """Log an event from EVENTS, unless its category is muted or above the log's verbosity.
+
+        Only the arguments are kept, the text is formatted when the message is shown, so events nobody reads cost
+        next to nothing. Events stack like messages.
+        """
+        template, level = EVENTS[category]
+        if level > self.verbosity or category in self.muted:
+            return
+        self._append(template, args, fg, True)
+
+    def _append(self, template: str, args: Tuple[Any, ...], fg: Tuple[int, int, int], stack: bool) -> None:
+        if stack and self.messages and self.messages[-1].template == template and self.messages[-1].args == args:
             self.messages[-1].count += 1
         else:
-            self.messages.append(Message(text, fg))
+            if self.archive_path is not None and len(self.messages) == self.messages.maxlen:
+                self._unarchived.append(self.messages[0])  # About to be pushed out by the new message.
+                if len(self._unarchived) >= ARCHIVE_BATCH:
+                    self.flush()
+            self.messages.append(Message(template, fg, args))
 
     def render(
         self, console: tcod.Console, x: int, y: int, width: int, height: int,
@@ -54,9 +156,8 @@ class MessageLog:
                 line, width, expand_tabs=True,
             )
 
-    @classmethod
+    @staticmethod
     def render_messages(
-        cls,
         console: tcod.Console,
         x: int,
         y: int,
@@ -71,7 +172,7 @@ class MessageLog:
         y_offset = height - 1
 
         for message in reversed(messages):
-            for line in reversed(list(cls.wrap(message.full_text, width))):
+            for line in reversed(message.wrapped(width)):
                 console.print(x=x, y=y + y_offset, string=line, fg=message.fg)
                 y_offset -= 1
                 if y_offset < 0:
@@ -1,9 +1,8 @@
 from __future__ import annotations
 
 import random
-import copy
 
-from typing import Dict, Iterator, List, Tuple, TYPE_CHECKING
+from typing import Dict, Iterator, List, Tuple, TYPE_CHECKING, Union
 
 import tcod
 
@@ -14,7 +13,9 @@ from equipment_types import EquipmentType
 
 if TYPE_CHECKING:
     from engine import Engine
-    from entity import Entity, Item
+    from entity import ActorPrototype, Entity, Item, ItemPrototype
+
+    Prototype = Union[ActorPrototype, ItemPrototype]
 
 # (floor, objects per room)
 max_items_by_floor = [
@@ -31,7 +32,7 @@ max_monsters_by_floor = [
     (10, 10),
 ]
 
-item_chances: Dict[int, List[Tuple[Entity, int]]] = {
+item_chances: Dict[int, List[Tuple[Prototype, int]]] = {
     0: [(entity_factories.health_kit, 70),
         (entity_factories.club, 5),
         (entity_factories.dagger, 5),
@@ -58,7 +59,7 @@ item_chances: Dict[int, List[Tuple[Entity, int]]] = {
         ],
 }
 
-enemy_chances: Dict[int, List[Tuple[Entity, int]]] = {
+enemy_chances: Dict[int, List[Tuple[Prototype, int]]] = {
     0: [(entity_factories.goblin, 80)],
     2: [(entity_factories.orc, 10)],
     4: [(entity_factories.ogre, 10), (entity_factories.orc, 30)],
@@ -111,9 +112,10 @@ class RectangularRoom:
 
 
 def get_entities_at_random(
-    weighted_chances_by_floor: Dict[int, List[Tuple[Entity, int]]],
+    weighted_chances_by_floor: Dict[int, List[Tuple[Prototype, int]]],
     number_of_entities: int,
     floor: int,
+    rng: random.Random,
 ) -> List[Entity]:
     entity_weighted_chances = {}
 
@@ -130,55 +132,53 @@ def get_entities_at_random(
     entities = list(entity_weighted_chances.keys())
     entity_weighted_chance_values = list(entity_weighted_chances.values())
 
-    uncopied_chosen_entities = random.choices(
+    chosen_prototypes = rng.choices(
         entities, weights=entity_weighted_chance_values, k=number_of_entities
     )
 
-    # copy entities to avoid PROBLEMS
-    chosen_entities = []
-    for entity in uncopied_chosen_entities:
-        chosen_entities.append(copy.deepcopy(entity))
-
-    return chosen_entities
+    # build fresh entities so nothing is shared between them
+    return [prototype.build() for prototype in chosen_prototypes]
 
 
-def place_entities(room: RectangularRoom, dungeon: GameMap, floor_number: int,) -> None:
-    number_of_monsters = random.randint(
+def place_entities(room: RectangularRoom, dungeon: GameMap, floor_number: int, rng: random.Random) -> None:
+    number_of_monsters = rng.randint(
         0, get_max_value_for_floor(max_monsters_by_floor, floor_number)
     )
-    number_of_items = random.randint(
+    number_of_items = rng.randint(
         0, get_max_value_for_floor(max_items_by_floor, floor_number)
     )
 
     monsters: List[Entity] = get_entities_at_random(
-        enemy_chances, number_of_monsters, floor_number
+        enemy_chances, number_of_monsters, floor_number, rng
     )
     items: List[Item] = get_entities_at_random(
-        item_chances, number_of_items, floor_number
+        item_chances, number_of_items, floor_number, rng
     )
 
     for item in items:
         if floor_number >= 3:
             if item.equippable is not None:
-                if random.randint(0, 1) == 1:
+                if rng.randint(0, 1) == 1:
                     item.equippable.enchant()
-                    if floor_number >= 6 and random.randint(0, 1) == 1:
+                    if floor_number >= 6 and rng.randint(0, 1) == 1:
                         item.equippable.enchant()
 
     for entity in monsters + items:
-        x = random.randint(room.x1 + 1, room.x2 - 1)
-        y = random.randint(room.y1 + 1, room.y2 - 1)
+        x = rng.randint(room.x1 + 1, room.x2 - 1)
+        y = rng.randint(room.y1 + 1, room.y2 - 1)
 
-        if not any(entity.x == x and entity.y == y for entity in dungeon.entities):
-            entity.spawn(dungeon, x, y)
+        if (x, y) != dungeon.upstairs_location and not dungeon.get_entities_at_location(x, y):
+            entity.place(x, y, dungeon)
 
 
-def place_hallway_entities(rooms: list[RectangularRoom], dungeon: GameMap, floor_number: int,) -> None:
+def place_hallway_entities(
+    rooms: list[RectangularRoom], dungeon: GameMap, floor_number: int, rng: random.Random
+) -> None:
     """Like normal place entities, except it only places in hallways."""
-    number_of_monsters = random.randint(
+    number_of_monsters = rng.randint(
         1, get_max_value_for_floor(max_monsters_by_floor, floor_number) * 2
     )
-    number_of_items = random.randint(
+    number_of_items = rng.randint(
         1, get_max_value_for_floor(max_items_by_floor, floor_number) * 2
     )
 
@@ -186,24 +186,24 @@ def place_hallway_entities(rooms: list[RectangularRoom], dungeon: GameMap, floor
     number_of_items *= 4
 
     monsters: List[Entity] = get_entities_at_random(
-        enemy_chances, number_of_monsters, floor_number
+        enemy_chances, number_of_monsters, floor_number, rng
     )
     items: List[Item] = get_entities_at_random(
-        item_chances, number_of_items, floor_number
+        item_chances, number_of_items, floor_number, rng
     )
 
     for item in items:
         if floor_number >= 3:
             if item.equippable is not None:
-                if random.randint(0, 1) == 1:
+                if rng.randint(0, 1) == 1:
                     item.equippable.enchant()
-                    if floor_number >= 6 and random.randint(0, 1) == 1:
+                    if floor_number >= 6 and rng.randint(0, 1) == 1:
                         item.equippable.enchant()
 
     for entity in monsters + items:
         while True:
-            x = random.randint(1, dungeon.width - 1)
-            y = random.randint(1, dungeon.height - 1)
+            x = rng.randint(1, dungeon.width - 1)
+            y = rng.randint(1, dungeon.height - 1)
 
             not_in_room = True
 
@@ -213,18 +213,18 @@ def place_hallway_entities(rooms: list[RectangularRoom], dungeon: GameMap, floor
                         not_in_room = False
 
                 if not_in_room:
-                    if not any(entity.x == x and entity.y == y for entity in dungeon.entities):
-                        entity.spawn(dungeon, x, y)
+                    if not dungeon.get_entities_at_location(x, y):
+                        entity.place(x, y, dungeon)
                         break
 
 
 def tunnel_between(
-    start: Tuple[int, int], end: Tuple[int, int]
+    start: Tuple[int, int], end: Tuple[int, int], rng: random.Random
 ) -> Iterator[Tuple[int, int]]:
     """Return an L-shaped tunnel between 'start' and 'end'."""
     x1, y1 = start
     x2, y2 = end
-    if random.random() < 0.5:  # 50% chance of either generation method.
+    if rng.random() < 0.5:  # 50% chance of either generation method.
         # Move horizontally, then vertically.
         corner_x, corner_y = x2, y1
     else:
@@ -244,22 +244,27 @@ def generate_dungeon(
     room_max_size: int,
     map_width: int,
     map_height: int,
+    floor_number: int,
     engine: Engine,
+    rng: random.Random,
 ) -> GameMap:
-    """Generate a new dungeon map."""
-    player = engine.player
-    dungeon = GameMap(engine, map_width, map_height, entities=[player])
+    """Generate a new dungeon map for the floor at depth 'floor_number'.
+
+    All randomness comes from 'rng' and nothing outside the new map is touched, so this can run off the main
+    thread and the same seed always gives the same floor.
+    """
+    dungeon = GameMap(engine, map_width, map_height)
 
     rooms: List[RectangularRoom] = []
 
     center_of_last_room = (0, 0)
 
     for r in range(max_rooms):
-        room_width = random.randint(room_min_size, room_max_size)
-        room_height = random.randint(room_min_size, room_max_size)
+        room_width = rng.randint(room_min_size, room_max_size)
+        room_height = rng.randint(room_min_size, room_max_size)
 
-        x = random.randint(0, dungeon.width - room_width - 1)
-        y = random.randint(0, dungeon.height - room_height - 1)
+        x = rng.randint(0, dungeon.width - room_width - 1)
+        y = rng.randint(0, dungeon.height - room_height - 1)
 
         # "RectangularRoom" class makes rectangles easier to work with
         new_room = RectangularRoom(x, y, room_width, room_height)
@@ -273,16 +278,16 @@ def generate_dungeon(
         dungeon.tiles[new_room.inner] = tile_types.floor
 
         if len(rooms) == 0:
-            # The first room, where the player starts.
-            player.place(*new_room.center, dungeon)
+            # The first room, where the player arrives.
+            dungeon.upstairs_location = new_room.center
         else:  # All rooms after the first.
             # Dig out a tunnel between this room and the previous one.
-            for x, y in tunnel_between(rooms[-1].center, new_room.center):
+            for x, y in tunnel_between(rooms[-1].center, new_room.center, rng):
                 dungeon.tiles[x, y] = tile_types.floor
 
             center_of_last_room = new_room.center
 
-        place_entities(new_room, dungeon, engine.game_world.current_floor)
+        place_entities(new_room, dungeon, floor_number, rng)
 
         dungeon.tiles[center_of_last_room] = tile_types.down_stairs
         dungeon.downstairs_location = center_of_last_room
@@ -291,7 +296,11 @@ def generate_dungeon(
         rooms.append(new_room)
     
     # sprinkle in some extra items/mobs randomly
-    place_hallway_entities(rooms, dungeon, engine.game_world.current_floor)
+    place_hallway_entities(rooms, dungeon, floor_number, rng)
+
+    if floor_number > 1:
+        # Placed last so no tunnel digs over it.
+        dungeon.tiles[dungeon.upstairs_location] = tile_types.up_stairs
 
 
     return dungeon
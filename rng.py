@@ -0,0 +1,54 @@
+"""Seeded random number streams, so a whole run can be reproduced from one seed."""
+from __future__ import annotations
+
+import random
+from typing import Any, Dict, Optional
+
+import numpy as np  # type: ignore
+
+
+class RNG:
+    """Separate random streams for combat (dice and item effects), batched dice rolls and AI, plus one map
+    generation stream per floor, all derived from one seed.
+
+    Keeping the streams apart means e.g. an extra AI decision does not change the damage of the next attack,
+    and floors come out the same no matter when or on which thread they are generated.
+    """
+
+    def __init__(self, seed: Optional[int] = None):
+        self.seed = seed if seed is not None else random.SystemRandom().getrandbits(32)
+        self.combat = random.Random(f"{self.seed}:combat")
+        self.ai = random.Random(f"{self.seed}:ai")
+        # NumPy stream for rolling batches of dice, see dice.roll_damage.
+        self.dice = np.random.Generator(np.random.PCG64(np.random.SeedSequence([self.seed, 1])))
+
+    def floor(self, depth: int) -> random.Random:
+        """Return a fresh map generation stream for the floor at 'depth'."""
+        return random.Random(f"{self.seed}:map:{depth}")
+
+    def get_state(self) -> Dict[str, Any]:
+        """Return the state of every stream as JSON compatible data."""
+        return {
+            "seed": self.seed,
+            "combat": _state_to_json(self.combat.getstate()),
+            "ai": _state_to_json(self.ai.getstate()),
+            "dice": self.dice.bit_generator.state,
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> RNG:
+        rng = cls(state["seed"])
+        rng.combat.setstate(_state_from_json(state["combat"]))
+        rng.ai.setstate(_state_from_json(state["ai"]))
+        rng.dice.bit_generator.state = state["dice"]
+        return rng
+
+
+def _state_to_json(state: tuple) -> list:
+    version, internal_state, gauss_next = state
+    return [version, list(internal_state), gauss_next]
+
+
+def _state_from_json(state: list) -> tuple:
+    version, internal_state, gauss_next = state
+    return version, tuple(internal_state), gauss_next
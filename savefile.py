@@ -0,0 +1,497 @@
+"""Read and write save files.
+
+A save file is laid out as:
+
+    magic (8 bytes) | format version (uint32) | reserved (uint32)
+    sections, each starting on a 64 byte boundary
+    index (JSON)
+    offset of the index (uint64)
+
+The map arrays are stored as raw NumPy buffers, so with the "none" compressor they can be memory-mapped straight
+from the file. Everything else goes into a JSON "state" section, where each entity is a compact record: the key of
+the prototype it was built from plus only the attributes that differ from a freshly built copy. Attributes added to
+a class later simply take their default, and attributes that no longer exist are ignored.
+
+Floors other than the current one are serialized in this same format and embedded as "floor.<depth>" sections.
+"""
+from __future__ import annotations
+
+from enum import Enum
+import importlib
+import io
+import json
+import lzma
+import os
+import struct
+import tempfile
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple, TYPE_CHECKING, Union
+import zlib
+
+import numpy as np  # type: ignore
+
+from components.ai import BaseAI
+from components.base_component import BaseComponent
+from entity import Actor, Entity, prototypes
+import entity_factories  # Registers the prototypes.
+from equipment_types import EquipmentCategory, EquipmentTraits, EquipmentType
+from render_order import RenderOrder
+from rng import RNG
+
+if TYPE_CHECKING:
+    from engine import Engine
+    from game_map import GameMap
+
+
+MAGIC = b"TB64SAV\0"
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+CHUNK_SIZE = 1 << 20
+
+DEFAULT_COMPRESSOR = "zlib"
+
+# Name -> (compressor factory, decompress function).
+COMPRESSORS: Dict[str, Tuple[Callable[[], Any], Callable[[bytes], bytes]]] = {
+    "none": (lambda: None, bytes),
+    "zlib": (lambda: zlib.compressobj(1), zlib.decompress),
+    "lzma": (lzma.LZMACompressor, lzma.decompress),
+}
+
+ENUMS = {enum.__name__: enum for enum in (EquipmentCategory, EquipmentTraits, EquipmentType, RenderOrder)}
+
+# Attributes that point back at the owner, restored from context when loading.
+BACK_REFERENCES = {"parent", "entity"}
+
+_header = struct.Struct("<8sII")
+_trailer = struct.Struct("<Q")
+
+
+class SaveFormatError(Exception):
+    """Raised when a file is not a save file this version can read."""
+
+
+class _Same:
+    """Marker for a value equal to the one on a freshly built entity, which is left out of the record."""
+
+
+SAME = _Same()
+
+
+def encode(value: Any, template: Any = None) -> Any:
+    """Return a JSON compatible form of 'value', or SAME if it equals 'template'."""
+    if isinstance(value, (BaseComponent, BaseAI)):
+        return encode_object(value, template)
+    if type(value) is type(template) and value == template:
+        return SAME
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, Enum):
+        return {"enum": f"{type(value).__name__}.{value.name}"}
+    if isinstance(value, tuple):
+        return {"tuple": [encode(v) for v in value]}
+    if isinstance(value, list):
+        return [encode(v) for v in value]
+    raise TypeError(f"Can not save a value of type {type(value).__name__}.")
+
+
+def encode_object(obj: Any, template: Any = None) -> Any:
+    """Encode a component or AI as its type and the attributes that differ from 'template'."""
+    if type(obj) is not type(template):
+        template = None
+
+    skipped = BACK_REFERENCES.union(getattr(obj, "cached_attributes", ()))
+    attrs = {}
+    for name, value in vars(obj).items():
+        if name in skipped:
+            continue
+        encoded = encode(value, getattr(template, name, None))
+        if encoded is not SAME:
+            attrs[name] = encoded
+
+    if template is not None and not attrs:
+        return SAME
+    return {"type": f"{type(obj).__module__}.{type(obj).__qualname__}", "attrs": attrs}
+
+
+def decode(data: Any, template: Any, owner: Any, actor: Optional[Actor]) -> Any:
+    """Rebuild a value written by 'encode', reusing 'template' where the types match."""
+    if isinstance(data, list):
+        return [decode(v, None, owner, actor) for v in data]
+    if not isinstance(data, dict):
+        return data
+    if "tuple" in data:
+        return tuple(decode(v, None, owner, actor) for v in data["tuple"])
+    if "enum" in data:
+        enum_name, member = data["enum"].split(".")
+        return ENUMS[enum_name][member]
+    return decode_object(data, template, owner, actor)
+
+
+def decode_object(data: Dict[str, Any], template: Any, owner: Any, actor: Optional[Actor]) -> Any:
+    cls = resolve_type(data["type"])
+    obj = template if type(template) is cls else cls.__new__(cls)
+
+    if isinstance(obj, BaseComponent):
+        obj.parent = owner
+    else:
+        obj.entity = actor
+
+    for name, value in data["attrs"].items():
+        if isinstance(getattr(cls, name, None), property):
+            continue  # Became a derived value since this file was written.
+        setattr(obj, name, decode(value, getattr(obj, name, None), obj, actor))
+    return obj
+
+
+def resolve_type(path: str) -> type:
+    """Return the component or AI class with the given dotted path."""
+    module_name, _, class_name = path.rpartition(".")
+    if not module_name.startswith("components."):
+        raise SaveFormatError(f"Unexpected type in save file: {path}")
+    cls = getattr(importlib.import_module(module_name), class_name, None)
+    if not (isinstance(cls, type) and issubclass(cls, (BaseComponent, BaseAI))):
+        raise SaveFormatError(f"Unexpected type in save file: {path}")
+    return cls
+
+
+class EntityEncoder:
+    """Turns entities into compact records, diffing each one against a fresh build of its prototype."""
+
+    # Handled separately since they hold other entities.
+    SKIPPED = BACK_REFERENCES | {"inventory", "equipment", "prototype_key"}
+
+    def __init__(self) -> None:
+        self.templates: Dict[str, Entity] = {}
+
+    def template(self, key: str) -> Entity:
+        if key not in self.templates:
+            self.templates[key] = prototypes[key].build()
+        return self.templates[key]
+
+    def encode(self, entity: Entity) -> Dict[str, Any]:
+        if entity.prototype_key is None:
+            raise ValueError(f"{entity.name} was not built from a prototype and can not be saved.")
+        template = self.template(entity.prototype_key)
+
+        attrs = {}
+        for name, value in vars(entity).items():
+            if name in self.SKIPPED:
+                continue
+            encoded = encode(value, getattr(template, name, None))
+            if encoded is not SAME:
+                attrs[name] = encoded
+
+        record: Dict[str, Any] = {"prototype": entity.prototype_key, "attrs": attrs}
+
+        if isinstance(entity, Actor):
+            items = entity.inventory.items
+            record["inventory"] = {
+                "capacity": entity.inventory.capacity,
+                "items": [self.encode(item) for item in items],
+            }
+            record["equipment"] = {
+                slot: items.index(item) for slot, item in entity.equipment.slots if item in items
+            }
+        return record
+
+
+def decode_entity(record: Dict[str, Any]) -> Entity:
+    """Build an entity from its prototype, then apply the saved attributes."""
+    try:
+        entity = prototypes[record["prototype"]].build()
+    except KeyError:
+        raise SaveFormatError(f"Unknown prototype in save file: {record['prototype']}")
+
+    actor = entity if isinstance(entity, Actor) else None
+    for name, value in record["attrs"].items():
+        if isinstance(getattr(type(entity), name, None), property):
+            continue
+        setattr(entity, name, decode(value, getattr(entity, name, None), entity, actor))
+
+    if actor is not None:
+        inventory = actor.inventory
+        inventory.capacity = record["inventory"]["capacity"]
+        for item_record in record["inventory"]["items"]:
+            inventory.add(decode_entity(item_record))
+        for slot, index in record["equipment"].items():
+            setattr(actor.equipment, slot, inventory.items[index])
+        actor.fighter.invalidate_derived_stats()
+    return entity
+
+
+class SaveWriter:
+    """Streams sections into a save file and records where each one went."""
+
+    def __init__(self, f: BinaryIO, compressor: str):
+        self.f = f
+        self.compressor = compressor
+        self.sections: List[Dict[str, Any]] = []
+        f.write(_header.pack(MAGIC, FORMAT_VERSION, 0))
+
+    def _align(self) -> None:
+        padding = -self.f.tell() % ALIGNMENT
+        self.f.write(b"\0" * padding)
+
+    def write_section(self, name: str, data: memoryview, compressor: Optional[str] = None, **info: Any) -> None:
+        """Write 'data' compressed with 'compressor', or with the compressor of the file if it is None."""
+        compressor = compressor or self.compressor
+        self._align()
+        offset = self.f.tell()
+        stream = COMPRESSORS[compressor][0]()
+        data = data.cast("B")
+        for start in range(0, len(data), CHUNK_SIZE):
+            chunk = data[start : start + CHUNK_SIZE]
+            self.f.write(stream.compress(chunk) if stream else chunk)
+        if stream:
+            self.f.write(stream.flush())
+        self.sections.append(
+            {
+                "name": name,
+                "offset": offset,
+                "size": self.f.tell() - offset,
+                "raw_size": len(data),
+                "compressor": compressor,
+                **info,
+            }
+        )
+
+    def write_array(self, name: str, array: np.ndarray) -> None:
+        self.write_section(
+            name,
+            # The transpose of a Fortran ordered array is C ordered, so this flattens without copying.
+            memoryview(np.asfortranarray(array).T.reshape(-1).view(np.uint8)),
+            dtype=np.lib.format.dtype_to_descr(array.dtype),
+            shape=list(array.shape),
+        )
+
+    def close(self) -> None:
+        self._align()
+        index_offset = self.f.tell()
+        self.f.write(json.dumps({"compressor": self.compressor, "sections": self.sections}).encode())
+        self.f.write(_trailer.pack(index_offset))
+
+
+class SaveReader:
+    """Reads sections from a save file, or from the bytes of one when 'source' is bytes."""
+
+    def __init__(self, source: Union[str, bytes]):
+        if isinstance(source, bytes):
+            self.filename: Optional[str] = None
+            self.f: BinaryIO = io.BytesIO(source)
+        else:
+            self.filename = source
+            self.f = open(source, "rb")
+
+        magic, version, _ = _header.unpack(self.f.read(_header.size))
+        if magic != MAGIC:
+            raise SaveFormatError("Not a save file, or a save from an older version of the game.")
+        if version != FORMAT_VERSION:
+            raise SaveFormatError(f"Unsupported save format version {version}.")
+
+        self.f.seek(-_trailer.size, os.SEEK_END)
+        (index_offset,) = _trailer.unpack(self.f.read(_trailer.size))
+        self.f.seek(index_offset)
+        index = json.loads(self.f.read()[: -_trailer.size])
+        self.sections = {section["name"]: section for section in index["sections"]}
+
+    def read_section(self, name: str) -> bytes:
+        section = self.sections[name]
+        self.f.seek(section["offset"])
+        return COMPRESSORS[section["compressor"]][1](self.f.read(section["size"]))
+
+    def read_array(self, name: str, mmap: bool = True) -> np.ndarray:
+        """Return a saved array. Uncompressed arrays are memory-mapped copy-on-write unless 'mmap' is False."""
+        section = self.sections[name]
+        dtype = np.lib.format.descr_to_dtype(_as_descr(section["dtype"]))
+        shape = tuple(section["shape"])
+        if section["compressor"] == "none" and mmap and self.filename is not None:
+            return np.memmap(self.filename, dtype=dtype, mode="c", offset=section["offset"], shape=shape, order="F")
+        return np.frombuffer(self.read_section(name), dtype=dtype).reshape(shape, order="F").copy(order="F")
+
+    def close(self) -> None:
+        self.f.close()
+
+
+def _as_descr(descr: Any) -> Any:
+    """JSON turns the tuples of a structured dtype description into lists, turn them back."""
+    if isinstance(descr, str):
+        return descr
+    return [(field[0], _as_descr(field[1]), *map(tuple, field[2:])) for field in descr]
+
+
+def write_map(writer: SaveWriter, game_map: GameMap, entities: List[Entity]) -> Dict[str, Any]:
+    """Write the arrays of 'game_map' and return the rest of its state, with 'entities' in that order."""
+    writer.write_array("tiles", game_map.tiles)
+    writer.write_array("explored", game_map.explored)
+
+    encoder = EntityEncoder()
+    index = {entity: number for number, entity in enumerate(entities)}
+    return {
+        "width": game_map.width,
+        "height": game_map.height,
+        "downstairs_location": list(game_map.downstairs_location),
+        "upstairs_location": list(game_map.upstairs_location),
+        "entities": [encoder.encode(entity) for entity in entities],
+        # Row order and turn order decide who goes first, kept so a loaded game plays on exactly the same.
+        "entity_rows": [game_map.entity_rows[entity] for entity in entities],
+        "free_rows": list(game_map._free_rows),
+        "scheduler": game_map.scheduler.get_state(index),
+    }
+
+
+def read_map(
+    reader: SaveReader, map_state: Dict[str, Any], engine: Engine, entities: Optional[List[Entity]] = None
+) -> GameMap:
+    """Rebuild a map written by 'write_map'.
+
+    'entities' are the already decoded entity records of 'map_state', they are decoded here if not given.
+    """
+    from game_map import GameMap
+    from scheduler import TurnScheduler
+
+    game_map = GameMap(engine, map_state["width"], map_state["height"])
+    game_map.tiles = reader.read_array("tiles")
+    game_map.explored = reader.read_array("explored")
+    game_map.downstairs_location = tuple(map_state["downstairs_location"])
+    game_map.upstairs_location = tuple(map_state["upstairs_location"])
+
+    if entities is None:
+        entities = [decode_entity(record) for record in map_state["entities"]]
+    for entity in entities:
+        entity.parent = game_map
+        game_map.add_entity(entity)
+    game_map.restore_entity_rows(entities, map_state["entity_rows"], map_state["free_rows"])
+    game_map.scheduler = TurnScheduler.from_state(map_state["scheduler"], entities)
+    return game_map
+
+
+def dump_floor(game_map: GameMap, compressor: str = DEFAULT_COMPRESSOR) -> bytes:
+    """Return an inactive floor serialized in the save format."""
+    f = io.BytesIO()
+    writer = SaveWriter(f, compressor)
+    state = write_map(writer, game_map, list(game_map.entities))
+    writer.write_section("state", memoryview(json.dumps(state, separators=(",", ":")).encode()))
+    writer.close()
+    return f.getvalue()
+
+
+def load_floor(data: bytes, engine: Engine) -> GameMap:
+    """Rebuild a floor from the bytes returned by 'dump_floor'."""
+    reader = SaveReader(data)
+    return read_map(reader, json.loads(reader.read_section("state")), engine)
+
+
+class FloorStore:
+    """Serialized floors kept in an anonymous temporary file, keyed by depth.
+
+    Only an offset and size per floor stays in memory. The file is append only, floors taken out or replaced
+    leave their old bytes behind until the store is dropped.
+    """
+
+    def __init__(self) -> None:
+        self.file = tempfile.TemporaryFile()
+        self.index: Dict[int, Tuple[int, int]] = {}
+
+    def __contains__(self, depth: int) -> bool:
+        return depth in self.index
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(sorted(self.index))
+
+    def __getitem__(self, depth: int) -> bytes:
+        offset, size = self.index[depth]
+        self.file.seek(offset)
+        return self.file.read(size)
+
+    def __setitem__(self, depth: int, data: bytes) -> None:
+        offset = self.file.seek(0, os.SEEK_END)
+        self.file.write(data)
+        self.index[depth] = offset, len(data)
+
+    def pop(self, depth: int) -> bytes:
+        data = self[depth]
+        del self.index[depth]
+        return data
+
+
+def save(engine: Engine, filename: str, compressor: Optional[str] = None) -> None:
+    """Write 'engine' and every floor of its world to 'filename' using the named compressor."""
+    compressor = compressor or DEFAULT_COMPRESSOR
+    if compressor not in COMPRESSORS:
+        raise ValueError(f"Unknown compressor {compressor!r}, expected one of {sorted(COMPRESSORS)}.")
+
+    game_world = engine.game_world
+    entities = list(engine.game_map.entities)
+    if engine.message_log.archive_path is not None:
+        engine.message_log.flush()  # The archive is not part of the save, it only has to be complete on disk.
+
+    # Write next to the destination and swap it in, so a crash never leaves a half written save and
+    # maps still memory-mapped from the old file stay valid.
+    temp_filename = f"{filename}.tmp"
+    with open(temp_filename, "wb") as f:
+        writer = SaveWriter(f, compressor)
+        map_state = write_map(writer, engine.game_map, entities)
+
+        # Other floors are already serialized, they are copied over as they are.
+        floors = []
+        for depth, data in game_world.serialized_floors():
+            writer.write_section(f"floor.{depth}", memoryview(data), compressor="none")
+            floors.append(depth)
+
+        state = {
+            "player": entities.index(engine.player),
+            "mouse_location": list(engine.mouse_location),
+            "magnification": engine.magnification,
+            "messages": [[m.plain_text, list(m.fg), m.count] for m in engine.message_log.messages],
+            "message_archive": engine.message_log.archive_path,
+            "game_world": {
+                "map_width": game_world.map_width,
+                "map_height": game_world.map_height,
+                "max_rooms": game_world.max_rooms,
+                "room_min_size": game_world.room_min_size,
+                "room_max_size": game_world.room_max_size,
+                "current_floor": game_world.current_floor,
+            },
+            "rng": engine.rng.get_state(),
+            "floors": floors,
+            "game_map": map_state,
+        }
+        writer.write_section("state", memoryview(json.dumps(state, separators=(",", ":")).encode()))
+        writer.close()
+    os.replace(temp_filename, filename)
+
+
+def load(filename: str) -> Engine:
+    """Read an Engine back from a file written by 'save'."""
+    from engine import Engine
+    from game_map import GameWorld
+    from message_log import Message
+    from viewport import Viewport
+
+    reader = SaveReader(filename)
+    try:
+        state = json.loads(reader.read_section("state"))
+        map_state = state["game_map"]
+        entities = [decode_entity(record) for record in map_state["entities"]]
+
+        engine = Engine(player=entities[state["player"]])
+        engine.rng = RNG.from_state(state["rng"])
+        engine.mouse_location = tuple(state["mouse_location"])
+        engine.magnification = state["magnification"]
+        engine.message_log.archive_path = state.get("message_archive")
+        for text, fg, count in state["messages"]:
+            message = Message(text, tuple(fg))
+            message.count = count
+            engine.message_log.messages.append(message)
+
+        engine.game_world = GameWorld(engine=engine, **state["game_world"])
+
+        engine.game_map = read_map(reader, map_state, engine, entities)
+        engine.game_world.floors[engine.game_world.current_floor] = engine.game_map
+        for depth in state["floors"]:
+            engine.game_world.stored_floors[depth] = reader.read_section(f"floor.{depth}")
+    finally:
+        reader.close()
+
+    engine.viewport = Viewport(engine=engine)
+    engine.update_fov()
+    return engine
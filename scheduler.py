@@ -0,0 +1,130 @@
+"""Turn order for the actors on a floor, by time instead of by counting turns."""
+from __future__ import annotations
+
+import heapq
+from typing import Any, Dict, Iterator, List, Sequence, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from entity import Actor
+
+# Ticks in one turn of a speed 0 actor. Divisible by 1 to 6 so speeds up to 5 get an exact share of the turn.
+TURN_TICKS = 60
+
+
+def action_delay(speed: int) -> int:
+    """Ticks between two actions of an actor with the given speed.
+
+    Speed n >= 0 gives n + 1 actions per turn, speed -n gives one action every n + 1 turns.
+    """
+    if speed >= 0:
+        return TURN_TICKS // (speed + 1)
+    return TURN_TICKS * (1 - speed)
+
+
+class TurnScheduler:
+    """Actors bucketed by the tick of their next action, with a heap of the ticks that have a bucket.
+
+    Only the actors that are due get looked at, and since most actors share a speed they share buckets, so
+    scheduling an actor is a list append rather than a heap push. Actors are taken out lazily: removing or
+    re-adding one just forgets its old entry, which is then skipped.
+
+    Parked actors are kept aside and cost nothing until they are woken up again.
+    """
+
+    def __init__(self) -> None:
+        self.time = 0  # Ticks since the floor was created or loaded.
+        self._times: List[int] = []  # Heap of the keys of '_buckets'.
+        self._buckets: Dict[int, List[Tuple[int, Actor]]] = {}  # Tick -> (sequence number, actor) in order added.
+        self._entries: Dict[Actor, int] = {}  # Actor -> sequence number of its current entry.
+        self._sequence = 0
+        self.parked: Dict[Actor, None] = {}  # Used as an ordered set.
+
+    def __contains__(self, actor: Actor) -> bool:
+        return actor in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, actor: Actor, time: int) -> None:
+        """Schedule 'actor' to act at 'time', replacing any earlier entry for it."""
+        self._sequence += 1
+        self._entries[actor] = self._sequence
+        bucket = self._buckets.get(time)
+        if bucket is None:
+            bucket = self._buckets[time] = []
+            heapq.heappush(self._times, time)
+        bucket.append((self._sequence, actor))
+
+    def remove(self, actor: Actor) -> None:
+        self._entries.pop(actor, None)
+        self.parked.pop(actor, None)
+
+    def park(self, actor: Actor) -> None:
+        """Stop scheduling 'actor' until 'wake' is called for it."""
+        self._entries.pop(actor, None)
+        self.parked[actor] = None
+
+    def wake(self, actor: Actor) -> None:
+        """Schedule a parked actor to act right away. Does nothing for actors that are not parked."""
+        if actor in self.parked:
+            del self.parked[actor]
+            self.add(actor, self.time)
+
+    def get_state(self, index: Dict[Actor, int]) -> Dict[str, Any]:
+        """Return the schedule as JSON data, with each actor replaced by its number in 'index'.
+
+        Actors missing from 'index' are left out. Every live entry is kept with its tick and sequence number, so
+        'from_state' gives back the same turn order.
+        """
+        scheduled = [
+            [index[actor], time, sequence]
+            for time, bucket in self._buckets.items()
+            for sequence, actor in bucket
+            if self._entries.get(actor) == sequence and actor in index
+        ]
+        scheduled.sort(key=lambda entry: (entry[1], entry[2]))
+        return {
+            "time": self.time,
+            "sequence": self._sequence,
+            "scheduled": scheduled,
+            "parked": [index[actor] for actor in self.parked if actor in index],
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any], entities: Sequence[Any]) -> TurnScheduler:
+        """Rebuild a scheduler from 'get_state', where 'entities' are numbered like the index given to it."""
+        scheduler = cls()
+        scheduler.time = state["time"]
+        scheduler._sequence = state["sequence"]
+        for number, time, sequence in state["scheduled"]:
+            actor = entities[number]
+            scheduler._entries[actor] = sequence
+            bucket = scheduler._buckets.get(time)
+            if bucket is None:
+                bucket = scheduler._buckets[time] = []
+                heapq.heappush(scheduler._times, time)
+            bucket.append((sequence, actor))
+        for number in state["parked"]:
+            scheduler.parked[entities[number]] = None
+        return scheduler
+
+    def due(self, until: int) -> Iterator[Actor]:
+        """Yield, in order, the actors due before 'until', each rescheduled after its action delay once it is yielded.
+
+        Actors (re)scheduled while iterating are picked up too if they come due before 'until'.
+        """
+        entries = self._entries
+        while self._times and self._times[0] < until:
+            time = self.time = self._times[0]
+            bucket = self._buckets[time]
+            i = 0
+            while i < len(bucket):  # The bucket can grow while its actors act.
+                sequence, actor = bucket[i]
+                i += 1
+                if entries.get(actor) != sequence:
+                    continue  # Removed or rescheduled since this entry was added.
+                self.add(actor, time + action_delay(actor.speed))
+                yield actor
+            heapq.heappop(self._times)
+            del self._buckets[time]
+        self.time = until
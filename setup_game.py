@@ -1,26 +1,25 @@
 """Handle the loading and initialization of game sessions."""
 from __future__ import annotations
 
-import copy
-import lzma
-import pickle
 from typing import Optional
 
-import tcod
-
 import color
 from engine import Engine
 import entity_factories
 from game_map import GameWorld
+import savefile
 from viewport import Viewport
 
 
-# Load the background image and remove the alpha channel.
-background_image = tcod.image.load("menu_background.png")[:, :, :3]
+# Messages that no longer fit in the message log are kept here for the history viewer.
+MESSAGE_ARCHIVE = "savegame.log"
+
 
+def new_game(seed: Optional[int] = None, message_archive: Optional[str] = MESSAGE_ARCHIVE) -> Engine:
+    """Return a brand new game session as an Engine instance, seeded with 'seed' or a random seed if None.
 
-def new_game() -> Engine:
-    """Return a brand new game session as an Engine instance."""
+    Old messages are archived to 'message_archive', or dropped if it is None.
+    """
     map_width = 100
     map_height = 60
 
@@ -28,10 +27,12 @@ def new_game() -> Engine:
     room_min_size = 6
     max_rooms = 30
 
-    player = copy.deepcopy(entity_factories.player)
+    player = entity_factories.player.build()
     player.fighter.heal(player.fighter.max_hp)
 
-    engine = Engine(player=player)
+    engine = Engine(player=player, seed=seed)
+    if message_archive is not None:
+        engine.message_log.open_archive(message_archive)
 
     engine.game_world = GameWorld(
         engine=engine,
@@ -52,16 +53,13 @@ def new_game() -> Engine:
         color.welcome_text
     )
 
-    dagger = copy.deepcopy(entity_factories.dagger)
-    leather_armor = copy.deepcopy(entity_factories.leather_armor)
+    dagger = entity_factories.dagger.build()
+    leather_armor = entity_factories.leather_armor.build()
 
-    dagger.parent = player.inventory
-    leather_armor.parent = player.inventory
-
-    player.inventory.items.append(dagger)
+    player.inventory.add(dagger)
     player.equipment.toggle_equip(dagger, add_message=False)
 
-    player.inventory.items.append(leather_armor)
+    player.inventory.add(leather_armor)
     player.equipment.toggle_equip(leather_armor, add_message=False)
 
     return engine
@@ -69,7 +67,4 @@ def new_game() -> Engine:
 
 def load_game(filename: str) -> Engine:
     """Load an Engine instance from a file."""
-    with open(filename, "rb") as f:
-        engine = pickle.loads(lzma.decompress(f.read()))
-    assert isinstance(engine, Engine)
-    return engine
+    return savefile.load(filename)
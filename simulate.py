@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""Play the game headless for a number of turns and report how fast the turn loop runs.
+
+Usage: python simulate.py [--seed N] [--turns N] [--policy descend|random] [--script KEYS] [--immortal]
+                   [--log-verbosity quiet|normal|verbose] [--check-save-load]
+
+Nothing is rendered and no window is opened. Turns go through EventHandler.handle_action exactly like key presses
+do, and the report is printed as JSON:
+
+- turns per second over the whole run,
+- per phase timings (the player's action, enemy turns and the FOV update) in milliseconds,
+- memory use: peak resident size, and the peak of traced Python allocations with --trace-memory.
+
+With --check-save-load it instead plays the turns, saves and loads the game, plays the same number of turns on
+both the game and the loaded copy, and reports whether they ended up in the same state.
+
+A script is a string of keys, repeated until the run is over: the digits 1-9 walk like the numpad (5 waits),
+"g" picks up, ">" and "<" take the stairs.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import actions
+from components.ai import BaseAI
+from engine import Engine
+import input_handlers
+import message_log
+import savefile
+import setup_game
+
+try:
+    import resource
+except ImportError:  # Not available on Windows.
+    resource = None  # type: ignore
+
+Policy = Callable[[Engine], actions.Action]
+
+SCRIPT_KEYS = {
+    "1": (-1, 1),
+    "2": (0, 1),
+    "3": (1, 1),
+    "4": (-1, 0),
+    "6": (1, 0),
+    "7": (-1, -1),
+    "8": (0, -1),
+    "9": (1, -1),
+}
+
+
+def random_policy(seed: int) -> Policy:
+    """Wander at random, picking things up now and then."""
+    rng = random.Random(seed)
+
+    def policy(engine: Engine) -> actions.Action:
+        player = engine.player
+        roll = rng.random()
+        if roll < 0.05:
+            return actions.PickupAction(player)
+        if roll < 0.1:
+            return actions.WaitAction(player)
+        return actions.BumpAction(player, *rng.choice(list(SCRIPT_KEYS.values())))
+
+    return policy
+
+
+def descend_policy(seed: int) -> Policy:
+    """Head for the stairs down, fighting whatever is in the way, and take them."""
+    wander = random_policy(seed)
+
+    def policy(engine: Engine) -> actions.Action:
+        player = engine.player
+        stairs = engine.game_map.downstairs_location
+        if (player.x, player.y) == stairs:
+            return actions.TakeStairsAction(player)
+        path = BaseAI(player).get_path_to(*stairs)
+        if not path:
+            return wander(engine)
+        x, y = path[0]
+        return actions.BumpAction(player, x - player.x, y - player.y)
+
+    return policy
+
+
+def script_policy(script: str) -> Policy:
+    """Play the keys of 'script', starting over when it runs out."""
+
+    def keys() -> Iterator[str]:
+        while True:
+            yield from script
+
+    next_key = keys().__next__
+
+    def policy(engine: Engine) -> actions.Action:
+        player = engine.player
+        key = next_key()
+        if key in SCRIPT_KEYS:
+            return actions.BumpAction(player, *SCRIPT_KEYS[key])
+        if key == "g":
+            return actions.PickupAction(player)
+        if key in "<>":
+            return actions.TakeStairsAction(player)
+        return actions.WaitAction(player)
+
+    return policy
+
+
+class PhaseTimer:
+    """Times calls to Engine methods by wrapping them on one instance."""
+
+    def __init__(self, engine: Engine, names: List[str]):
+        self.samples: Dict[str, List[float]] = {name: [] for name in names}
+        self.current: Dict[str, float] = dict.fromkeys(names, 0.0)
+        for name in names:
+            setattr(engine, name, self.wrap(name, getattr(engine, name)))
+
+    def wrap(self, name: str, func: Callable[..., Any]) -> Callable[..., Any]:
+        def timed(*args: Any, **kwargs: Any) -> Any:
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.current[name] += time.perf_counter() - start
+
+        return timed
+
+    def end_turn(self) -> Dict[str, float]:
+        """Record and return the time of each phase this turn."""
+        turn = dict(self.current)
+        for name, seconds in turn.items():
+            self.samples[name].append(seconds)
+            self.current[name] = 0.0
+        return turn
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """Return timing statistics in milliseconds."""
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+    return {
+        "total": sum(samples) * 1000,
+        "mean": statistics.fmean(samples) * 1000,
+        "p50": ordered[len(ordered) // 2] * 1000,
+        "p95": ordered[int(len(ordered) * 0.95)] * 1000,
+        "max": ordered[-1] * 1000,
+    }
+
+
+def simulate(
+    seed: int,
+    turns: int,
+    policy: Policy,
+    immortal: bool = False,
+    trace_memory: bool = False,
+    log_verbosity: int = message_log.VERBOSE,
+) -> Dict[str, Any]:
+    """Play 'turns' player actions on a new game seeded with 'seed' and return the report.
+
+    Impossible actions, like walking into a wall, are counted but do not advance the game.
+    """
+    if trace_memory:
+        tracemalloc.start()
+
+    engine = setup_game.new_game(seed, message_archive=None)
+    engine.message_log.verbosity = log_verbosity
+    if immortal:
+        # Enough hit points that no single turn can kill the player, topped up every turn.
+        engine.player.fighter.ancestry.hp_boost += 100_000
+    handler = input_handlers.EventHandler(engine)
+    timer = PhaseTimer(engine, ["handle_enemy_turns", "update_fov"])
+    action_samples: List[float] = []
+
+    turns_run = 0
+    impossible = 0
+    start = time.perf_counter()
+    for _ in range(turns):
+        if not engine.player.is_alive:
+            break
+        if immortal:
+            engine.player.fighter.heal(engine.player.fighter.max_hp)
+
+        turn_start = time.perf_counter()
+        if handler.handle_action(policy(engine)):
+            turns_run += 1
+        else:
+            impossible += 1
+        elapsed = time.perf_counter() - turn_start
+
+        phases = timer.end_turn()
+        action_samples.append(elapsed - sum(phases.values()))
+
+        engine.animator.clear()  # Nothing plays them without rendering.
+        while engine.player.level.requires_level_up:
+            engine.player.level.increase_level()
+    seconds = time.perf_counter() - start
+
+    memory: Dict[str, Optional[float]] = {"max_rss_kib": None, "traced_peak_kib": None}
+    if resource is not None:
+        memory["max_rss_kib"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if trace_memory:
+        memory["traced_peak_kib"] = tracemalloc.get_traced_memory()[1] / 1024
+        tracemalloc.stop()
+
+    return {
+        "seed": seed,
+        "turns": turns_run,
+        "impossible_actions": impossible,
+        "seconds": seconds,
+        "turns_per_second": turns_run / seconds if seconds else None,
+        "player_alive": engine.player.is_alive,
+        "floor": engine.game_world.current_floor,
+        "entities": len(engine.game_map.entities),
+        "phases_ms": {
+            "action": summarize(action_samples),
+            "enemy_turns": summarize(timer.samples["handle_enemy_turns"]),
+            "fov": summarize(timer.samples["update_fov"]),
+        },
+        "memory": memory,
+    }
+
+
+def play(engine: Engine, policy: Policy, turns: int, immortal: bool = False) -> None:
+    """Play 'turns' player actions like 'simulate' does, without timing them."""
+    handler = input_handlers.EventHandler(engine)
+    for _ in range(turns):
+        if not engine.player.is_alive:
+            break
+        if immortal:
+            engine.player.fighter.heal(engine.player.fighter.max_hp)
+        handler.handle_action(policy(engine))
+        engine.animator.clear()
+        while engine.player.level.requires_level_up:
+            engine.player.level.increase_level()
+
+
+def fingerprint(engine: Engine) -> Dict[str, Any]:
+    """The state that has to match between a game and a saved and loaded copy of it."""
+    game_map = engine.game_map
+    player = engine.player
+    return {
+        "floor": engine.game_world.current_floor,
+        "time": game_map.scheduler.time,
+        "scheduled": len(game_map.scheduler),
+        "parked": len(game_map.scheduler.parked),
+        "player": [player.x, player.y, player.fighter.hp, player.level.current_xp],
+        "actors": sorted([actor.name, actor.x, actor.y, actor.fighter.hp] for actor in game_map.actors),
+        "rng": json.loads(json.dumps(engine.rng.get_state())),
+    }
+
+
+def check_save_load(seed: int, turns: int, immortal: bool = False) -> Dict[str, Any]:
+    """Play 'turns', then save and load, then play 'turns' more on both copies with the same policy.
+
+    Both copies must end up in the same state, or a save and load changes how the game plays out.
+    """
+    engine = setup_game.new_game(seed, message_archive=None)
+    if immortal:
+        engine.player.fighter.ancestry.hp_boost += 100_000
+    play(engine, descend_policy(seed), turns, immortal)
+
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "check.sav")
+        savefile.save(engine, filename)
+        loaded = savefile.load(filename)
+        saved_state, loaded_state = fingerprint(engine), fingerprint(loaded)
+
+        for copy in (engine, loaded):
+            play(copy, descend_policy(seed + 1), turns, immortal)
+        final_states = fingerprint(engine), fingerprint(loaded)
+
+    return {
+        "seed": seed,
+        "turns": turns,
+        "loaded_matches": saved_state == loaded_state,
+        "continued_matches": final_states[0] == final_states[1],
+        "saved": {key: saved_state[key] for key in ("floor", "time", "scheduled", "parked")},
+        "continued": [{key: state[key] for key in ("floor", "time", "scheduled", "parked")} for state in final_states],
+    }
+
+
+def main(argv: List[str]) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--turns", type=int, default=1000)
+    parser.add_argument("--policy", choices=["descend", "random"], default="descend")
+    parser.add_argument("--script", help="keys to play instead of a policy")
+    parser.add_argument("--immortal", action="store_true", help="keep the player alive with a huge, always full health pool")
+    parser.add_argument("--trace-memory", action="store_true", help="trace Python allocations (slow)")
+    parser.add_argument(
+        "--log-verbosity", choices=["quiet", "normal", "verbose"], default="verbose",
+        help="combat events to log, quiet skips them all",
+    )
+    parser.add_argument(
+        "--check-save-load", action="store_true",
+        help="check that a saved and loaded game plays on exactly like the original",
+    )
+    parser.add_argument("--output", help="write the report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    if args.script:
+        policy = script_policy(args.script)
+    elif args.policy == "random":
+        policy = random_policy(args.seed)
+    else:
+        policy = descend_policy(args.seed)
+
+    if args.check_save_load:
+        report = check_save_load(args.seed, args.turns, immortal=args.immortal)
+    else:
+        report = simulate(
+            args.seed,
+            args.turns,
+            policy,
+            immortal=args.immortal,
+            trace_memory=args.trace_memory,
+            log_verbosity=getattr(message_log, args.log_verbosity.upper()),
+        )
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if args.check_save_load and not (report["loaded_matches"] and report["continued_matches"]):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -51,4 +51,11 @@ down_stairs = new_tile(
     transparent=True,
     dark=(0xE005, (255, 255, 255, 255), (0, 0, 0, 255)),
     light=(0xE004, (255, 255, 255, 255), (0, 0, 0, 255)),
-)
\ No newline at end of file
+)
+up_stairs = new_tile(
+    walkable=True,
+    transparent=True,
+    # There is no up stairs graphic in the tileset, so these are the down stairs tinted blue.
+    dark=(0xE005, (128, 160, 255, 255), (0, 0, 0, 255)),
+    light=(0xE004, (128, 160, 255, 255), (0, 0, 0, 255)),
+)
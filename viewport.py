@@ -5,7 +5,6 @@ from typing import TYPE_CHECKING, Optional, Tuple
 import numpy as np # type: ignore
 from tcod.console import Console
 
-from entity import Actor
 from game_map import GameMap
 from render_order import RenderOrder
 
@@ -100,20 +99,31 @@ class Viewport:
             default=tile_types.SHROUD,
         )
 
-        entities_sorted_for_rendering = sorted(
-            self.game_map.entities, key=lambda x: x.render_order.value
+        self.render_entities(i_console, m_console)
+
+    def render_entities(self, i_console: Console, m_console: Console) -> None:
+        """Draw the entities in the player's FOV that fall inside the viewport.
+
+        Live actors go on the monster console, everything else (items, corpses) on the item console.
+        """
+        data = self.game_map.entity_data
+        console_x = data["x"] + self.x_offset
+        console_y = data["y"] + self.y_offset
+
+        # Only draw used rows that land on the console, then only those in the FOV.
+        mask = (
+            (data["render_order"] > 0)
+            & (0 <= console_x) & (console_x < i_console.width)
+            & (0 <= console_y) & (console_y < i_console.height)
         )
+        mask[mask] = self.game_map.visible[data["x"][mask], data["y"][mask]]
+
+        # Sort by render order so higher layers overwrite lower ones on the same tile.
+        drawn = np.flatnonzero(mask)
+        drawn = drawn[np.argsort(data["render_order"][drawn], kind="stable")]
+        is_actor = data["render_order"][drawn] == RenderOrder.ACTOR.value
 
-        for entity in entities_sorted_for_rendering:
-            # Only print entities that are in the FOV
-            if self.game_map.visible[entity.x, entity.y]:
-
-                # if entity is a live actor, print it to the monster console, otherwise print it to the item console
-                if isinstance(entity, Actor) and entity.render_order != RenderOrder.CORPSE:
-                    m_console.print(
-                        x=entity.x + self.x_offset, y=entity.y + self.y_offset, string=entity.char, fg=(255, 255, 255),
-                    )
-                else:
-                    i_console.print(
-                        x=entity.x + self.x_offset, y=entity.y + self.y_offset, string=entity.char, fg=(255, 255, 255),
-                    )
\ No newline at end of file
+        for console, rows in ((m_console, drawn[is_actor]), (i_console, drawn[~is_actor])):
+            index = console_x[rows], console_y[rows]
+            console.rgba["ch"][index] = data["ch"][rows]
+            console.rgba["fg"][index] = (255, 255, 255, 255)